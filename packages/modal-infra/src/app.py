@@ -5,6 +5,7 @@ This module defines the Modal app and shared resources used across
 all sandbox operations.
 """
 
+import functools
 import os
 from urllib.parse import urlparse
 
@@ -21,13 +22,14 @@ app = modal.App("open-inspect")
 # Includes all dependencies needed by the function modules at import time
 function_image = (
     modal.Image.debian_slim(python_version="3.12")
-    .apt_install("git")  # For scheduler git ls-remote checks
+    .apt_install("git")  # For scheduler git ls-remote fallback
     .pip_install(
         "pydantic>=2.0",
         "httpx",
         "fastapi",
         "modal",  # Required for sandbox.manager imports
         "PyJWT[crypto]",  # For GitHub App token generation
+        "cryptography",  # For internal API token HMACs (also pulled in by PyJWT[crypto])
     )
 )
 
@@ -55,7 +57,13 @@ internal_api_secret = modal.Secret.from_name(
 )
 
 
-def _get_allowed_hosts() -> set[str]:
+@functools.lru_cache(maxsize=4)
+def _parse_allowed_hosts(hosts_str: str) -> frozenset[str]:
+    """Parse a comma-separated host list once per distinct value."""
+    return frozenset(h.strip().lower() for h in hosts_str.split(",") if h.strip())
+
+
+def _get_allowed_hosts() -> frozenset[str]:
     """
     Get the set of allowed control plane hosts from environment.
 
@@ -64,13 +72,31 @@ def _get_allowed_hosts() -> set[str]:
 
     Example: "open-inspect-control-plane-prod.myaccount.workers.dev,localhost:8787"
 
+    The environment is read on every call (so secret rotation and tests that
+    patch it take effect), but the parsed set is cached per distinct value.
+
     Returns:
         Set of allowed host strings (lowercase)
     """
-    hosts_str = os.environ.get("ALLOWED_CONTROL_PLANE_HOSTS", "")
-    if not hosts_str:
-        return set()
-    return {h.strip().lower() for h in hosts_str.split(",") if h.strip()}
+    return _parse_allowed_hosts(os.environ.get("ALLOWED_CONTROL_PLANE_HOSTS", ""))
+
+
+@functools.lru_cache(maxsize=64)
+def _control_plane_host(url: str) -> str | None:
+    """
+    Extract the lowercase host (including port) from a control plane URL.
+
+    Cached because builds repeatedly call back to the same few URLs.
+
+    Returns:
+        The host string, or None if the URL cannot be parsed
+    """
+    try:
+        # Get host with port if present (e.g., "localhost:8787" or "example.com")
+        return urlparse(url).netloc.lower()
+    except Exception as e:
+        log.warn("security.url_parse_error", exc=e)
+        return None
 
 
 def validate_control_plane_url(url: str | None) -> bool:
@@ -105,14 +131,8 @@ def validate_control_plane_url(url: str | None) -> bool:
         log.warn("security.hosts_not_configured")
         return False
 
-    try:
-        parsed = urlparse(url)
-        # Get host with port if present (e.g., "localhost:8787" or "example.com")
-        host = parsed.netloc.lower()
-        return host in allowed_hosts
-    except Exception as e:
-        log.warn("security.url_parse_error", exc=e)
-        return False
+    host = _control_plane_host(url)
+    return host is not None and host in allowed_hosts
 
 
 # Volume for persistent storage (snapshot metadata, logs)
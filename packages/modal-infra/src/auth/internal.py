@@ -5,11 +5,17 @@ Provides HMAC-SHA256 time-based token verification for service-to-service
 authentication. This mirrors the TypeScript implementation in packages/shared/src/auth.ts.
 """
 
+import functools
 import hashlib
 import hmac
 import os
+import re
+import threading
 import time
 
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives import hmac as crypto_hmac
+
 from ..log_config import get_logger
 
 log = get_logger("auth")
@@ -17,6 +23,72 @@ log = get_logger("auth")
 # Token validity window in seconds (5 minutes)
 TOKEN_VALIDITY_SECONDS = 5 * 60
 
+# Signatures are lowercase hex-encoded SHA-256 digests, as generate_internal_token emits
+_SIGNATURE_RE = re.compile(r"[0-9a-f]{64}")
+
+# Successful verifications can be cached for VERIFY_CACHE_TTL seconds (off by default).
+# Entries are keyed by a keyed hash of the header, never the raw token, and map to
+# their expiry in Unix milliseconds.
+VERIFY_CACHE_MAX_SIZE = 4096
+_verify_cache: dict[bytes, int] = {}
+_verify_cache_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=4)
+def _hmac_proto(secret_bytes: bytes) -> crypto_hmac.HMAC:
+    """
+    Get a keyed HMAC-SHA256 context for a secret.
+
+    Uses OpenSSL via `cryptography`, which has less per-call overhead than
+    hashlib for short messages. Callers `.copy()` the cached context so the
+    key setup happens once per secret rather than once per token.
+    """
+    return crypto_hmac.HMAC(secret_bytes, hashes.SHA256())
+
+
+def _hmac_sha256(secret_bytes: bytes, message: bytes) -> bytes:
+    """Compute HMAC-SHA256 of `message` from the cached keyed context."""
+    h = _hmac_proto(secret_bytes).copy()
+    h.update(message)
+    return h.finalize()
+
+
+@functools.lru_cache(maxsize=4)
+def _verify_cache_key_secret(secret_bytes: bytes) -> bytes:
+    """Derive (via SHA-256 of the secret) the BLAKE2b key for hashing cached headers."""
+    return hashlib.sha256(secret_bytes).digest()
+
+
+def _verify_cache_ttl() -> float:
+    """Get the verification cache TTL in seconds from VERIFY_CACHE_TTL (0 disables it)."""
+    raw = os.environ.get("VERIFY_CACHE_TTL", "")
+    if not raw:
+        return 0.0
+    try:
+        return max(float(raw), 0.0)
+    except ValueError:
+        return 0.0
+
+
+def _verify_cache_get(key: bytes, now_ms: int) -> bool:
+    """Return True if a cached successful verification is still live."""
+    with _verify_cache_lock:
+        expires_at_ms = _verify_cache.get(key)
+        if expires_at_ms is None:
+            return False
+        if now_ms >= expires_at_ms:
+            del _verify_cache[key]
+            return False
+        return True
+
+
+def _verify_cache_put(key: bytes, expires_at_ms: int) -> None:
+    """Cache a successful verification, evicting the oldest entry when full."""
+    with _verify_cache_lock:
+        if key not in _verify_cache and len(_verify_cache) >= VERIFY_CACHE_MAX_SIZE:
+            del _verify_cache[next(iter(_verify_cache))]
+        _verify_cache[key] = expires_at_ms
+
 
 class AuthConfigurationError(Exception):
     """Raised when authentication is not properly configured."""
@@ -70,15 +142,12 @@ def generate_internal_token(secret: str | None = None) -> str:
     if secret is None:
         secret = require_secret()
 
-    timestamp_str = str(int(time.time() * 1000))
+    # The timestamp is ASCII digits, so build it as bytes and decode the token once
+    timestamp_bytes = b"%d" % (time.time_ns() // 1_000_000)
 
-    signature = hmac.new(
-        secret.encode("utf-8"),
-        timestamp_str.encode("utf-8"),
-        hashlib.sha256,
-    ).hexdigest()
+    signature = _hmac_sha256(secret.encode("utf-8"), timestamp_bytes).hex()
 
-    return f"{timestamp_str}.{signature}"
+    return (timestamp_bytes + b"." + signature.encode("ascii")).decode("ascii")
 
 
 def verify_internal_token(auth_header: str | None, secret: str | None = None) -> bool:
@@ -89,6 +158,9 @@ def verify_internal_token(auth_header: str | None, secret: str | None = None) ->
     - timestamp: Unix milliseconds when the token was generated
     - signature: HMAC-SHA256 of the timestamp using the shared secret (hex encoded)
 
+    When VERIFY_CACHE_TTL is set, successful verifications are cached for that
+    many seconds (bounded by the token's validity window). Failures are never cached.
+
     Args:
         auth_header: The Authorization header value (e.g., "Bearer timestamp.signature")
         secret: The shared secret for HMAC verification. If not provided, reads from
@@ -106,38 +178,62 @@ def verify_internal_token(auth_header: str | None, secret: str | None = None) ->
     if not auth_header or not auth_header.startswith("Bearer "):
         return False
 
-    token = auth_header[7:]  # Remove "Bearer " prefix
-    parts = token.split(".")
+    # Work in integer milliseconds throughout (token timestamps are Unix ms)
+    now_ms = time.time_ns() // 1_000_000
 
-    if len(parts) != 2:
-        return False
+    cache_ttl = _verify_cache_ttl()
+    cache_key = b""
+    if cache_ttl:
+        cache_key = hashlib.blake2b(
+            auth_header.encode("utf-8"),
+            digest_size=16,
+            key=_verify_cache_key_secret(secret.encode("utf-8")),
+        ).digest()
+        if _verify_cache_get(cache_key, now_ms):
+            return True
 
-    timestamp_str, signature = parts
+    token = auth_header[7:]  # Remove "Bearer " prefix
+    timestamp_str, sep, signature = token.partition(".")
 
-    try:
-        token_time_ms = int(timestamp_str)
-    except ValueError:
+    # Exactly one "." separates timestamp and signature
+    if not sep or "." in signature:
         return False
 
-    # Convert to seconds for comparison
-    token_time = token_time_ms / 1000
-    now = time.time()
+    # Unix milliseconds are plain ASCII digits; this also rejects signs and
+    # whitespace that int() would accept, without raising on bad input
+    if not (10 <= len(timestamp_str) <= 16 and timestamp_str.isascii() and timestamp_str.isdigit()):
+        return False
+    token_time_ms = int(timestamp_str)
 
     # Reject tokens outside the validity window
-    if abs(now - token_time) > TOKEN_VALIDITY_SECONDS:
+    age_ms = now_ms - token_time_ms
+    if age_ms < 0:
+        age_ms = -age_ms
+    if age_ms > TOKEN_VALIDITY_SECONDS * 1000:
         log.debug(
             "auth.token_expired",
-            age_s=round(abs(now - token_time), 1),
+            age_s=round(age_ms / 1000, 1),
             max_s=TOKEN_VALIDITY_SECONDS,
         )
         return False
 
+    # Decode the provided signature so the raw digests can be compared. Only the
+    # exact lowercase form is accepted, as with the earlier hex-string comparison.
+    if not _SIGNATURE_RE.fullmatch(signature):
+        return False
+    signature_bytes = bytes.fromhex(signature)
+
     # Compute expected signature
-    expected_signature = hmac.new(
-        secret.encode("utf-8"),
-        timestamp_str.encode("utf-8"),
-        hashlib.sha256,
-    ).hexdigest()
+    expected_signature = _hmac_sha256(secret.encode("utf-8"), timestamp_str.encode("utf-8"))
 
     # Constant-time comparison to prevent timing attacks
-    return hmac.compare_digest(signature, expected_signature)
+    if not hmac.compare_digest(signature_bytes, expected_signature):
+        return False
+
+    # Only successes are cached, and never past the token's validity window
+    if cache_ttl:
+        _verify_cache_put(
+            cache_key,
+            min(now_ms + int(cache_ttl * 1000), token_time_ms + TOKEN_VALIDITY_SECONDS * 1000),
+        )
+    return True
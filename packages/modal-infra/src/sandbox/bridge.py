@@ -14,11 +14,13 @@ import asyncio
 import contextlib
 import json
 import os
+import re
 import secrets
 import subprocess
 import tempfile
 import time
-from collections.abc import AsyncIterator
+from collections import deque
+from collections.abc import AsyncIterator, Awaitable, Callable
 from pathlib import Path
 from typing import Any, ClassVar
 
@@ -32,6 +34,22 @@ from .types import GitUser
 
 configure_logging()
 
+# Compact JSON encoder for WS events. Reusing one encoder instance avoids the
+# per-call JSONEncoder construction json.dumps does when given options. Frames
+# must stay text (str): the control plane ignores binary WS messages.
+_encode_event = json.JSONEncoder(separators=(",", ":")).encode
+
+# WS handshake rejections that mean the session is gone; retrying is futile.
+# One regex pass instead of a substring scan per status code.
+_FATAL_HTTP_STATUS_RE = re.compile(
+    r"HTTP (?:"
+    r"401"  # Unauthorized
+    r"|403"  # Forbidden
+    r"|404"  # Session not found
+    r"|410"  # Session terminated (stopped/stale)
+    r")"
+)
+
 # Fallback git identity when prompt author has no SCM name/email configured.
 # Matches the co-author trailer used in generateCommitMessage (shared/git.ts).
 FALLBACK_GIT_USER = GitUser(name="OpenInspect", email="open-inspect@noreply.github.com")
@@ -140,12 +158,29 @@ class AgentBridge:
     GIT_CONFIG_TIMEOUT_SECONDS = 10.0
     MAX_PENDING_PART_EVENTS = 2000
     MAX_EVENT_BUFFER_SIZE = 1000
-    CRITICAL_EVENT_TYPES: ClassVar[set[str]] = {
-        "execution_complete",
-        "error",
-        "snapshot_ready",
-        "push_complete",
-        "push_error",
+    MAX_PENDING_ACKS = 1000
+    CRITICAL_EVENT_TYPES: ClassVar[frozenset[str]] = frozenset(
+        {
+            "execution_complete",
+            "error",
+            "snapshot_ready",
+            "push_complete",
+            "push_error",
+        }
+    )
+
+    # Command type -> handler. Handlers are looked up through self at call time,
+    # so per-instance overrides (e.g. stubs in tests) still apply.
+    COMMAND_HANDLERS: ClassVar[
+        dict[str, Callable[["AgentBridge", dict[str, Any]], Awaitable[None]]]
+    ] = {
+        "prompt": lambda self, cmd: self._start_prompt_task(cmd),
+        "stop": lambda self, _cmd: self._handle_stop(),
+        "snapshot": lambda self, _cmd: self._handle_snapshot(),
+        "shutdown": lambda self, _cmd: self._handle_shutdown(),
+        "git_sync_complete": lambda self, cmd: self._handle_git_sync_complete(cmd),
+        "push": lambda self, cmd: self._handle_push(cmd),
+        "ack": lambda self, cmd: self._handle_ack(cmd),
     }
 
     def __init__(
@@ -194,11 +229,12 @@ class AgentBridge:
         self._current_prompt_task: asyncio.Task[None] | None = None
 
         # Event buffer: survives WS reconnection, flushed on reconnect
-        self._event_buffer: list[dict[str, Any]] = []
+        self._event_buffer: deque[dict[str, Any]] = deque()
 
         # Pending ACKs: events sent but not yet acknowledged by the control plane.
-        # Keyed by ackId, re-sent on reconnect until the DO confirms receipt.
-        self._pending_acks: dict[str, dict[str, Any]] = {}
+        # Keyed by ackId, holding the serialized event so it can be re-sent on
+        # reconnect (without re-encoding) until the DO confirms receipt.
+        self._pending_acks: dict[str, str] = {}
 
         # Tracks the message ID of the currently executing prompt
         self._inflight_message_id: str | None = None
@@ -277,7 +313,8 @@ class AgentBridge:
                     attempt=reconnect_attempts,
                     delay_s=round(delay, 1),
                 )
-                await asyncio.sleep(delay)
+                if await self._wait_for_shutdown(delay):
+                    break
 
         finally:
             # Cancel any in-flight prompt task before closing resources
@@ -301,13 +338,7 @@ class AgentBridge:
         For these errors, retrying is futile - the bridge should exit and
         allow the control plane to spawn a new sandbox if needed.
         """
-        fatal_patterns = [
-            "HTTP 401",  # Unauthorized
-            "HTTP 403",  # Forbidden
-            "HTTP 404",  # Session not found
-            "HTTP 410",  # Session terminated (stopped/stale)
-        ]
-        return any(pattern in error_str for pattern in fatal_patterns)
+        return _FATAL_HTTP_STATUS_RE.search(error_str) is not None
 
     async def _connect_and_run(self) -> None:
         """Connect to control plane and handle messages.
@@ -375,12 +406,21 @@ class AgentBridge:
                 ) from e
             raise
 
-    async def _heartbeat_loop(self) -> None:
-        """Send periodic heartbeat events."""
-        while not self.shutdown_event.is_set():
-            await asyncio.sleep(self.HEARTBEAT_INTERVAL)
+    async def _wait_for_shutdown(self, timeout: float) -> bool:
+        """Sleep for up to timeout seconds, waking immediately on shutdown.
+
+        Returns:
+            True if shutdown was requested, False if the timeout elapsed
+        """
+        with contextlib.suppress(TimeoutError):
+            async with asyncio.timeout(timeout):
+                await self.shutdown_event.wait()
+        return self.shutdown_event.is_set()
 
-            if self.ws and self.ws.state == State.OPEN:
+    async def _heartbeat_loop(self) -> None:
+        """Send periodic heartbeat events until shutdown."""
+        while not await self._wait_for_shutdown(self.HEARTBEAT_INTERVAL):
+            if self.ws is not None and self.ws.state is State.OPEN:
                 await self._send_event(
                     {
                         "type": "heartbeat",
@@ -394,20 +434,23 @@ class AgentBridge:
         """Send event to control plane, buffering if WS is unavailable."""
         event_type = event.get("type", "unknown")
         event["sandboxId"] = self.sandbox_id
-        event["timestamp"] = event.get("timestamp", time.time())
+        # Only read the clock for events that don't carry their own timestamp
+        if "timestamp" not in event:
+            event["timestamp"] = time.time()
 
         is_critical = event_type in self.CRITICAL_EVENT_TYPES
         if is_critical and "ackId" not in event:
-            event["ackId"] = self._make_ack_id(event)
+            event["ackId"] = self._make_ack_id(event_type, event.get("messageId"))
 
-        if not self.ws or self.ws.state != State.OPEN:
+        if self.ws is None or self.ws.state is not State.OPEN:
             self._buffer_event(event)
             return
 
         try:
-            await self.ws.send(json.dumps(event))
+            wire = _encode_event(event)
+            await self.ws.send(wire)
             if is_critical:
-                self._pending_acks[event["ackId"]] = event
+                self._track_pending_ack(event["ackId"], wire)
         except Exception as e:
             self.log.warn("bridge.send_error", event_type=event_type, exc=e)
             self._buffer_event(event)
@@ -427,15 +470,16 @@ class AgentBridge:
         just_added: set[str] = set()
         while self._event_buffer:
             event = self._event_buffer[0]
-            if not self.ws or self.ws.state != State.OPEN:
+            if self.ws is None or self.ws.state is not State.OPEN:
                 break
             try:
-                await self.ws.send(json.dumps(event))
-                self._event_buffer.pop(0)
+                wire = _encode_event(event)
+                await self.ws.send(wire)
+                self._event_buffer.popleft()
                 flushed += 1
                 # Track critical events sent from buffer as pending ACKs
                 if event.get("type") in self.CRITICAL_EVENT_TYPES and "ackId" in event:
-                    self._pending_acks[event["ackId"]] = event
+                    self._track_pending_ack(event["ackId"], wire)
                     just_added.add(event["ackId"])
             except Exception as e:
                 self.log.warn("bridge.flush_send_error", exc=e)
@@ -452,14 +496,19 @@ class AgentBridge:
         """Buffer an event for later delivery after WS reconnect."""
         if len(self._event_buffer) >= self.MAX_EVENT_BUFFER_SIZE:
             # Evict oldest non-critical event; fall back to oldest if all critical
-            evicted = False
-            for i, buffered in enumerate(self._event_buffer):
-                if buffered.get("type") not in self.CRITICAL_EVENT_TYPES:
-                    self._event_buffer.pop(i)
-                    evicted = True
-                    break
-            if not evicted:
-                self._event_buffer.pop(0)
+            critical_types = self.CRITICAL_EVENT_TYPES
+            evict_index = next(
+                (
+                    i
+                    for i, buffered in enumerate(self._event_buffer)
+                    if buffered.get("type") not in critical_types
+                ),
+                None,
+            )
+            if evict_index is None:
+                self._event_buffer.popleft()
+            else:
+                del self._event_buffer[evict_index]
 
         self._event_buffer.append(event)
         self.log.debug(
@@ -468,16 +517,26 @@ class AgentBridge:
             buffer_size=len(self._event_buffer),
         )
 
+    def _track_pending_ack(self, ack_id: str, wire: str) -> None:
+        """Remember a sent critical event until ACKed, evicting the oldest if full."""
+        if ack_id not in self._pending_acks and len(self._pending_acks) >= self.MAX_PENDING_ACKS:
+            # Dicts preserve insertion order, so the first key is the oldest
+            evicted = next(iter(self._pending_acks))
+            del self._pending_acks[evicted]
+            self.log.warn("bridge.pending_ack_evicted", ack_id=evicted)
+        self._pending_acks[ack_id] = wire
+
     @staticmethod
-    def _make_ack_id(event: dict[str, Any]) -> str:
+    def _make_ack_id(event_type: str, message_id: str | None) -> str:
         """Generate a deterministic ack ID for a critical event.
 
         Format: "{type}:{messageId}" for events with messageId,
         "{type}:{random_hex}" for events without (e.g., snapshot_ready).
         Deterministic IDs give natural deduplication on the DO side.
+
+        Takes the fields rather than the event so the caller, which has
+        already read the type, doesn't pay for a second lookup.
         """
-        event_type = event.get("type", "unknown")
-        message_id = event.get("messageId")
         if message_id:
             return f"{event_type}:{message_id}"
         return f"{event_type}:{secrets.token_hex(8)}"
@@ -495,14 +554,17 @@ class AgentBridge:
             return
 
         self.log.info("bridge.flush_pending_acks_start", count=len(self._pending_acks))
+        # Snapshot in send order (ACKs may arrive mid-flush), dropping skipped ids up front
+        if skip_ack_ids:
+            to_send = [item for item in self._pending_acks.items() if item[0] not in skip_ack_ids]
+        else:
+            to_send = list(self._pending_acks.items())
         resent = 0
-        for ack_id, event in list(self._pending_acks.items()):
-            if skip_ack_ids and ack_id in skip_ack_ids:
-                continue
-            if not self.ws or self.ws.state != State.OPEN:
+        for ack_id, wire in to_send:
+            if self.ws is None or self.ws.state is not State.OPEN:
                 break
             try:
-                await self.ws.send(json.dumps(event))
+                await self.ws.send(wire)
                 resent += 1
             except Exception as e:
                 self.log.warn("bridge.flush_pending_ack_error", ack_id=ack_id, exc=e)
@@ -525,60 +587,62 @@ class AgentBridge:
         cmd_type = cmd.get("type")
         self.log.debug("bridge.command_received", cmd_type=cmd_type)
 
-        if cmd_type == "prompt":
-            message_id = cmd.get("messageId") or cmd.get("message_id", "unknown")
-            task = asyncio.create_task(self._handle_prompt(cmd))
-            self._current_prompt_task = task
-
-            def handle_task_exception(t: asyncio.Task[None], mid: str = message_id) -> None:
-                if self._current_prompt_task is t:
-                    self._current_prompt_task = None
-                if t.cancelled():
-                    asyncio.create_task(
-                        self._send_event(
-                            {
-                                "type": "execution_complete",
-                                "messageId": mid,
-                                "success": False,
-                                "error": "Task was cancelled",
-                            }
-                        )
+        handler = self.COMMAND_HANDLERS.get(cmd_type) if isinstance(cmd_type, str) else None
+        if handler is None:
+            self.log.debug("bridge.unknown_command", cmd_type=cmd_type)
+            return None
+        await handler(self, cmd)
+        return None
+
+    async def _start_prompt_task(self, cmd: dict[str, Any]) -> None:
+        """Run a prompt as a tracked background task.
+
+        The task is deliberately not returned to _handle_command's caller:
+        prompt tasks must survive WS disconnects. Returning it would add it to
+        background_tasks, which gets cancelled in the _connect_and_run finally
+        block on WS close.
+        """
+        message_id = cmd.get("messageId") or cmd.get("message_id", "unknown")
+        task = asyncio.create_task(self._handle_prompt(cmd))
+        self._current_prompt_task = task
+
+        def handle_task_exception(t: asyncio.Task[None], mid: str = message_id) -> None:
+            if self._current_prompt_task is t:
+                self._current_prompt_task = None
+            if t.cancelled():
+                asyncio.create_task(
+                    self._send_event(
+                        {
+                            "type": "execution_complete",
+                            "messageId": mid,
+                            "success": False,
+                            "error": "Task was cancelled",
+                        }
                     )
-                elif exc := t.exception():
-                    asyncio.create_task(
-                        self._send_event(
-                            {
-                                "type": "execution_complete",
-                                "messageId": mid,
-                                "success": False,
-                                "error": str(exc),
-                            }
-                        )
+                )
+            elif exc := t.exception():
+                asyncio.create_task(
+                    self._send_event(
+                        {
+                            "type": "execution_complete",
+                            "messageId": mid,
+                            "success": False,
+                            "error": str(exc),
+                        }
                     )
+                )
 
-            task.add_done_callback(handle_task_exception)
-            # Don't return the task — prompt tasks must survive WS disconnects.
-            # Returning it would add it to background_tasks, which gets cancelled
-            # in the _connect_and_run finally block on WS close.
-            return None
-        elif cmd_type == "stop":
-            await self._handle_stop()
-        elif cmd_type == "snapshot":
-            await self._handle_snapshot()
-        elif cmd_type == "shutdown":
-            await self._handle_shutdown()
-        elif cmd_type == "git_sync_complete":
-            self.git_sync_complete.set()
-        elif cmd_type == "push":
-            await self._handle_push(cmd)
-        elif cmd_type == "ack":
-            ack_id = cmd.get("ackId")
-            if ack_id and ack_id in self._pending_acks:
-                del self._pending_acks[ack_id]
-                self.log.debug("bridge.ack_received", ack_id=ack_id)
-        else:
-            self.log.debug("bridge.unknown_command", cmd_type=cmd_type)
-        return None
+        task.add_done_callback(handle_task_exception)
+
+    async def _handle_git_sync_complete(self, cmd: dict[str, Any]) -> None:
+        """Handle git_sync_complete command - unblock prompts waiting on git sync."""
+        self.git_sync_complete.set()
+
+    async def _handle_ack(self, cmd: dict[str, Any]) -> None:
+        """Handle ack command - stop re-sending an acknowledged critical event."""
+        ack_id = cmd.get("ackId")
+        if ack_id and self._pending_acks.pop(ack_id, None) is not None:
+            self.log.debug("bridge.ack_received", ack_id=ack_id)
 
     async def _handle_prompt(self, cmd: dict[str, Any]) -> None:
         """Handle prompt command - send to OpenCode and stream response."""
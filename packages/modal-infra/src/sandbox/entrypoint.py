@@ -47,6 +47,8 @@ class SandboxSupervisor:
     START_SCRIPT_PATH = ".openinspect/start.sh"
     DEFAULT_SETUP_TIMEOUT_SECONDS = 300
     DEFAULT_START_TIMEOUT_SECONDS = 120
+    HOOK_OUTPUT_TAIL_LINES = 50
+    HOOK_OUTPUT_TAIL_BYTES = 64 * 1024
 
     def __init__(self):
         self.opencode_process: asyncio.subprocess.Process | None = None
@@ -72,6 +74,14 @@ class SandboxSupervisor:
         session_config_json = os.environ.get("SESSION_CONFIG", "{}")
         self.session_config = json.loads(session_config_json)
 
+        # Startup hook timeouts
+        self.setup_timeout_seconds = self._int_from_env(
+            "SETUP_TIMEOUT_SECONDS", self.DEFAULT_SETUP_TIMEOUT_SECONDS
+        )
+        self.start_timeout_seconds = self._int_from_env(
+            "START_TIMEOUT_SECONDS", self.DEFAULT_START_TIMEOUT_SECONDS
+        )
+
         # Paths
         self.workspace_path = Path("/workspace")
         self.repo_path = self.workspace_path / self.repo_name
@@ -86,6 +96,14 @@ class SandboxSupervisor:
             session_id=session_id,
         )
 
+    @staticmethod
+    def _int_from_env(name: str, default: int) -> int:
+        """Read an integer env var, falling back to ``default`` if unset or invalid."""
+        try:
+            return int(os.environ.get(name, default))
+        except ValueError:
+            return default
+
     @property
     def base_branch(self) -> str:
         """The branch to clone/fetch — defaults to 'main'."""
@@ -592,13 +610,17 @@ class SandboxSupervisor:
         env["OPENINSPECT_BOOT_MODE"] = self.boot_mode
         return env
 
+    def _output_tail(self, output: bytes | bytearray) -> str:
+        """Return the last HOOK_OUTPUT_TAIL_LINES lines of hook output."""
+        lines = output.decode(errors="replace").splitlines()
+        return "\n".join(lines[-self.HOOK_OUTPUT_TAIL_LINES :])
+
     async def _run_hook(
         self,
         *,
         hook_name: str,
         relative_script_path: str,
-        timeout_env_var: str,
-        default_timeout_seconds: int,
+        timeout_seconds: int,
     ) -> bool:
         """
         Run a repo hook script if present.
@@ -618,11 +640,6 @@ class SandboxSupervisor:
             )
             return True
 
-        try:
-            timeout_seconds = int(os.environ.get(timeout_env_var, str(default_timeout_seconds)))
-        except ValueError:
-            timeout_seconds = default_timeout_seconds
-
         self.log.info(
             f"{hook_name}.start",
             script=str(script_path),
@@ -640,27 +657,30 @@ class SandboxSupervisor:
                 env=self._hook_env(),
             )
 
+            # Stream output into a bounded tail instead of buffering it all;
+            # package installs can print tens of MB.
+            tail = bytearray()
             try:
-                stdout, _ = await asyncio.wait_for(process.communicate(), timeout=timeout_seconds)
+                async with asyncio.timeout(timeout_seconds):
+                    if process.stdout:
+                        while chunk := await process.stdout.read(self.HOOK_OUTPUT_TAIL_BYTES):
+                            tail += chunk
+                            del tail[: -self.HOOK_OUTPUT_TAIL_BYTES]
+                    await process.wait()
             except TimeoutError:
                 process.kill()
-                stdout = await process.stdout.read() if process.stdout else b""
                 await process.wait()
-                output_tail = "\n".join(stdout.decode(errors="replace").splitlines()[-50:])
                 duration_ms = int((time.time() - start_time) * 1000)
                 self.log.error(
                     f"{hook_name}.timeout",
                     timeout_seconds=timeout_seconds,
-                    output_tail=output_tail,
+                    output_tail=self._output_tail(tail),
                     script=str(script_path),
                     duration_ms=duration_ms,
                     boot_mode=self.boot_mode,
                 )
                 return False
 
-            output_tail = "\n".join(
-                (stdout.decode(errors="replace") if stdout else "").splitlines()[-50:]
-            )
             duration_ms = int((time.time() - start_time) * 1000)
 
             if process.returncode == 0:
@@ -677,7 +697,7 @@ class SandboxSupervisor:
             self.log.error(
                 f"{hook_name}.failed",
                 exit_code=process.returncode,
-                output_tail=output_tail,
+                output_tail=self._output_tail(tail),
                 script=str(script_path),
                 duration_ms=duration_ms,
                 boot_mode=self.boot_mode,
@@ -708,8 +728,7 @@ class SandboxSupervisor:
         return await self._run_hook(
             hook_name="setup",
             relative_script_path=self.SETUP_SCRIPT_PATH,
-            timeout_env_var="SETUP_TIMEOUT_SECONDS",
-            default_timeout_seconds=self.DEFAULT_SETUP_TIMEOUT_SECONDS,
+            timeout_seconds=self.setup_timeout_seconds,
         )
 
     async def run_start_script(self) -> bool:
@@ -722,8 +741,7 @@ class SandboxSupervisor:
         return await self._run_hook(
             hook_name="start",
             relative_script_path=self.START_SCRIPT_PATH,
-            timeout_env_var="START_TIMEOUT_SECONDS",
-            default_timeout_seconds=self.DEFAULT_START_TIMEOUT_SECONDS,
+            timeout_seconds=self.start_timeout_seconds,
         )
 
     async def _quick_git_fetch(self) -> None:
@@ -1,8 +1,11 @@
 """Shared test fixtures and utilities for modal-infra tests."""
 
 from typing import Any
+from unittest.mock import MagicMock, patch
 
 import httpx
+import pytest
+from websockets import State
 
 
 class MockResponse:
@@ -23,3 +26,137 @@ class MockResponse:
                 request=httpx.Request("GET", "http://test"),
                 response=httpx.Response(self.status_code),
             )
+
+
+class MockWebSocket:
+    """Lightweight WebSocket stub that records sent frames.
+
+    Tests that need send to fail can assign their own coroutine to ``send``.
+    """
+
+    def __init__(self, state: State = State.OPEN):
+        self.state = state
+        self.sent: list[str] = []
+
+    async def send(self, data: str) -> None:
+        self.sent.append(data)
+
+
+class _MockStdout:
+    """Pipe stand-in that hands out one queued chunk per read(), then EOF."""
+
+    def __init__(self, chunks: list[bytes], *, hang: bool):
+        self._chunks = chunks
+        self._hang = hang
+
+    async def read(self, n: int = -1) -> bytes:
+        if self._chunks:
+            return self._chunks.pop(0)
+        if self._hang:
+            raise TimeoutError
+        return b""
+
+
+class MockProcess:
+    """Lightweight stand-in for the process returned by asyncio.create_subprocess_exec.
+
+    ``stdout`` is delivered as a single chunk, or one read() per item when given a list.
+    With ``hang=True`` reading past the output raises TimeoutError as if the caller's
+    timeout fired.
+    """
+
+    def __init__(
+        self, returncode: int = 0, stdout: bytes | list[bytes] = b"", *, hang: bool = False
+    ):
+        self.returncode = returncode
+        chunks = [stdout] if isinstance(stdout, bytes) else list(stdout)
+        self.stdout = _MockStdout([c for c in chunks if c], hang=hang)
+        self.kill_count = 0
+        self.wait_count = 0
+
+    def kill(self) -> None:
+        self.kill_count += 1
+
+    async def wait(self) -> int:
+        self.wait_count += 1
+        return self.returncode
+
+
+def patch_subprocess_exec(process: MockProcess):
+    """Patch asyncio.create_subprocess_exec to return ``process``.
+
+    A plain MagicMock records the calls; its side effect is the coroutine the caller awaits.
+    """
+
+    async def create_subprocess_exec(*args, **kwargs):
+        return process
+
+    return patch(
+        "asyncio.create_subprocess_exec", new_callable=MagicMock, side_effect=create_subprocess_exec
+    )
+
+
+@pytest.fixture
+def fake_modal(monkeypatch) -> dict[str, Any]:
+    """Patch ``modal.Sandbox.create`` and ``modal.Image.from_id`` in the sandbox manager.
+
+    Returns a dict that records the ``env``, ``timeout`` and ``secrets`` of the most
+    recent ``Sandbox.create`` call, plus the ``timeouts`` of every call in order.
+    """
+    captured: dict[str, Any] = {"timeouts": []}
+
+    class FakeSandbox:
+        object_id = "obj-123"
+        stdout = None
+
+    class FakeImage:
+        object_id = "img-123"
+
+    def fake_create(*args, **kwargs):
+        captured["env"] = kwargs.get("env")
+        captured["timeout"] = kwargs.get("timeout")
+        captured["secrets"] = kwargs.get("secrets")
+        captured["timeouts"].append(captured["timeout"])
+        return FakeSandbox()
+
+    monkeypatch.setattr("src.sandbox.manager.modal.Sandbox.create", fake_create)
+    monkeypatch.setattr("src.sandbox.manager.modal.Image.from_id", lambda *a, **kw: FakeImage())
+    return captured
+
+
+@pytest.fixture(scope="module")
+def sandbox_manager():
+    """One SandboxManager per test module; pair with ``fake_modal`` for per-test patches.
+
+    Module-scoped rather than session-scoped because the manager keeps warm-pool state.
+    """
+    from src.sandbox.manager import SandboxManager
+
+    return SandboxManager()
+
+
+SUPERVISOR_ENV = {
+    "SANDBOX_ID": "test-sandbox",
+    "CONTROL_PLANE_URL": "https://cp.example.com",
+    "SANDBOX_AUTH_TOKEN": "tok",
+    "REPO_OWNER": "acme",
+    "REPO_NAME": "app",
+}
+
+
+@pytest.fixture
+def supervisor(monkeypatch, tmp_path):
+    """SandboxSupervisor built from ``SUPERVISOR_ENV`` with repo_path under tmp_path."""
+    from src.sandbox.entrypoint import SandboxSupervisor
+
+    for key, value in SUPERVISOR_ENV.items():
+        monkeypatch.setenv(key, value)
+    # Hook timeouts fall back to the class defaults
+    monkeypatch.delenv("SETUP_TIMEOUT_SECONDS", raising=False)
+    monkeypatch.delenv("START_TIMEOUT_SECONDS", raising=False)
+    # run() exports the boot mode for hooks; register it so it is removed afterwards
+    monkeypatch.delenv("OPENINSPECT_BOOT_MODE", raising=False)
+
+    sup = SandboxSupervisor()
+    sup.repo_path = tmp_path / "app"
+    return sup
@@ -7,14 +7,15 @@ and that prompt tasks survive WS disconnects.
 
 import asyncio
 import json
+from collections import deque
 from typing import Any
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, patch
 
 import pytest
 from websockets import State
 
 from src.sandbox.bridge import AgentBridge
-from tests.conftest import MockResponse
+from tests.conftest import MockResponse, MockWebSocket
 
 
 class MockHttpClient:
@@ -54,9 +55,10 @@ class MockSSEResponse:
         self._events = events
 
     async def aiter_text(self):
-        for event in self._events:
-            yield event
-            await asyncio.sleep(0)
+        # Each event already ends with the SSE "\n\n" separator, so the whole
+        # stream can be delivered as one chunk.
+        if self._events:
+            yield "".join(self._events)
 
     async def __aenter__(self):
         return self
@@ -88,7 +90,6 @@ def bridge() -> AgentBridge:
 class TestEventBuffering:
     """Tests for event buffering when WS is unavailable."""
 
-    @pytest.mark.asyncio
     async def test_send_event_buffers_when_ws_none(self, bridge: AgentBridge):
         """Events should be buffered, not dropped, when WS is None."""
         bridge.ws = None
@@ -102,23 +103,36 @@ class TestEventBuffering:
         assert bridge._event_buffer[0]["sandboxId"] == "test-sandbox"
         assert "timestamp" in bridge._event_buffer[0]
 
-    @pytest.mark.asyncio
+    async def test_send_event_keeps_existing_timestamp(self, bridge: AgentBridge):
+        """Events stamped by the caller keep their original timestamp."""
+        bridge.ws = None
+
+        await bridge._send_event({"type": "heartbeat", "timestamp": 123.0})
+
+        assert bridge._event_buffer[0]["timestamp"] == 123.0
+
     async def test_send_event_buffers_when_ws_not_open(self, bridge: AgentBridge):
         """Events should be buffered when WS exists but is not OPEN."""
-        mock_ws = MagicMock()
-        mock_ws.state = State.CLOSED
-        bridge.ws = mock_ws
+        bridge.ws = MockWebSocket(State.CLOSED)
 
         await bridge._send_event({"type": "execution_complete", "messageId": "msg-1"})
 
         assert len(bridge._event_buffer) == 1
         assert bridge._event_buffer[0]["type"] == "execution_complete"
 
-    @pytest.mark.asyncio
+    async def test_send_event_skips_encoding_when_ws_down(self, bridge: AgentBridge):
+        """Buffered events should not be serialized until they are actually sent."""
+        bridge.ws = MockWebSocket(State.CLOSED)
+
+        with patch("src.sandbox.bridge._encode_event") as mock_encode:
+            await bridge._send_event({"type": "token", "content": "data"})
+
+        mock_encode.assert_not_called()
+        assert len(bridge._event_buffer) == 1
+
     async def test_send_event_buffers_on_send_exception(self, bridge: AgentBridge):
         """Events should be buffered when ws.send() throws."""
-        mock_ws = MagicMock()
-        mock_ws.state = State.OPEN
+        mock_ws = MockWebSocket()
         mock_ws.send = AsyncMock(side_effect=ConnectionError("broken pipe"))
         bridge.ws = mock_ws
 
@@ -130,11 +144,13 @@ class TestEventBuffering:
     def test_buffer_overflow_evicts_non_critical_first(self, bridge: AgentBridge):
         """When buffer is full, non-critical events should be evicted before critical ones."""
         # Fill buffer with a mix of critical and non-critical events
-        bridge._event_buffer = [
-            {"type": "execution_complete", "messageId": "msg-1"},  # critical
-            {"type": "token", "content": "a"},  # non-critical
-            {"type": "error", "messageId": "msg-2"},  # critical
-        ]
+        bridge._event_buffer = deque(
+            [
+                {"type": "execution_complete", "messageId": "msg-1"},  # critical
+                {"type": "token", "content": "a"},  # non-critical
+                {"type": "error", "messageId": "msg-2"},  # critical
+            ]
+        )
         bridge.MAX_EVENT_BUFFER_SIZE = 3
 
         bridge._buffer_event({"type": "snapshot_ready"})
@@ -150,10 +166,12 @@ class TestEventBuffering:
 
     def test_buffer_overflow_evicts_oldest_critical_if_all_critical(self, bridge: AgentBridge):
         """When all events are critical, oldest gets evicted."""
-        bridge._event_buffer = [
-            {"type": "execution_complete", "messageId": "msg-1"},
-            {"type": "error", "messageId": "msg-2"},
-        ]
+        bridge._event_buffer = deque(
+            [
+                {"type": "execution_complete", "messageId": "msg-1"},
+                {"type": "error", "messageId": "msg-2"},
+            ]
+        )
         bridge.MAX_EVENT_BUFFER_SIZE = 2
 
         bridge._buffer_event({"type": "push_complete"})
@@ -169,32 +187,28 @@ class TestEventBuffering:
 class TestEventFlush:
     """Tests for flushing buffered events on reconnect."""
 
-    @pytest.mark.asyncio
     async def test_flush_sends_all_and_clears_buffer(self, bridge: AgentBridge):
         """Flushing should send all buffered events and clear the buffer."""
-        mock_ws = MagicMock()
-        mock_ws.state = State.OPEN
-        sent_data: list[str] = []
-        mock_ws.send = AsyncMock(side_effect=lambda data: sent_data.append(data))
+        mock_ws = MockWebSocket()
         bridge.ws = mock_ws
 
-        bridge._event_buffer = [
-            {"type": "token", "content": "a"},
-            {"type": "execution_complete", "messageId": "msg-1"},
-        ]
+        bridge._event_buffer = deque(
+            [
+                {"type": "token", "content": "a"},
+                {"type": "execution_complete", "messageId": "msg-1"},
+            ]
+        )
 
         await bridge._flush_event_buffer()
 
         assert len(bridge._event_buffer) == 0
-        assert len(sent_data) == 2
-        assert json.loads(sent_data[0])["type"] == "token"
-        assert json.loads(sent_data[1])["type"] == "execution_complete"
+        assert len(mock_ws.sent) == 2
+        assert json.loads(mock_ws.sent[0])["type"] == "token"
+        assert json.loads(mock_ws.sent[1])["type"] == "execution_complete"
 
-    @pytest.mark.asyncio
     async def test_flush_stops_on_send_failure(self, bridge: AgentBridge):
         """Flushing should stop when a send fails, keeping remaining events buffered."""
-        mock_ws = MagicMock()
-        mock_ws.state = State.OPEN
+        mock_ws = MockWebSocket()
         call_count = 0
 
         async def flaky_send(data):
@@ -206,11 +220,13 @@ class TestEventFlush:
         mock_ws.send = flaky_send
         bridge.ws = mock_ws
 
-        bridge._event_buffer = [
-            {"type": "token", "content": "a"},
-            {"type": "token", "content": "b"},
-            {"type": "execution_complete", "messageId": "msg-1"},
-        ]
+        bridge._event_buffer = deque(
+            [
+                {"type": "token", "content": "a"},
+                {"type": "token", "content": "b"},
+                {"type": "execution_complete", "messageId": "msg-1"},
+            ]
+        )
 
         await bridge._flush_event_buffer()
 
@@ -219,7 +235,6 @@ class TestEventFlush:
         assert bridge._event_buffer[0]["content"] == "b"
         assert bridge._event_buffer[1]["type"] == "execution_complete"
 
-    @pytest.mark.asyncio
     async def test_flush_noop_when_buffer_empty(self, bridge: AgentBridge):
         """Flushing an empty buffer should be a no-op."""
         assert len(bridge._event_buffer) == 0
@@ -230,7 +245,6 @@ class TestEventFlush:
 class TestPromptTaskDecoupling:
     """Tests that prompt tasks survive WS disconnects."""
 
-    @pytest.mark.asyncio
     async def test_prompt_task_survives_ws_disconnect(self, bridge: AgentBridge):
         """Prompt task should NOT be cancelled when WS disconnects."""
         prompt_started = asyncio.Event()
@@ -262,7 +276,6 @@ class TestPromptTaskDecoupling:
         await task
         await asyncio.sleep(0)
 
-    @pytest.mark.asyncio
     async def test_prompt_task_cancelled_on_run_exit(self, bridge: AgentBridge):
         """run() finally block should cancel the prompt task before closing http_client."""
         prompt_started = asyncio.Event()
@@ -287,7 +300,6 @@ class TestPromptTaskDecoupling:
 
         assert task.done()
 
-    @pytest.mark.asyncio
     async def test_execution_complete_buffered_and_flushed(self, bridge: AgentBridge):
         """execution_complete should be buffered when WS is down and flushed on reconnect."""
         bridge.ws = None
@@ -305,22 +317,18 @@ class TestPromptTaskDecoupling:
         assert bridge._event_buffer[0]["type"] == "execution_complete"
 
         # Simulate reconnect
-        mock_ws = MagicMock()
-        mock_ws.state = State.OPEN
-        sent_data: list[str] = []
-        mock_ws.send = AsyncMock(side_effect=lambda data: sent_data.append(data))
+        mock_ws = MockWebSocket()
         bridge.ws = mock_ws
 
         await bridge._flush_event_buffer()
 
         assert len(bridge._event_buffer) == 0
-        assert len(sent_data) == 1
-        parsed = json.loads(sent_data[0])
+        assert len(mock_ws.sent) == 1
+        parsed = json.loads(mock_ws.sent[0])
         assert parsed["type"] == "execution_complete"
         assert parsed["messageId"] == "msg-1"
         assert parsed["success"] is True
 
-    @pytest.mark.asyncio
     async def test_inflight_message_id_set_on_prompt(self, bridge: AgentBridge):
         """_handle_prompt should set _inflight_message_id."""
         http_client = bridge.http_client
@@ -25,7 +25,6 @@ def bridge() -> AgentBridge:
 class TestGitIdentityConfiguration:
     """Tests for git identity fallback in _handle_prompt."""
 
-    @pytest.mark.asyncio
     async def test_uses_author_identity_when_provided(self, bridge: AgentBridge):
         """Should use scmName/scmEmail from the prompt author when both are present."""
         bridge._configure_git_identity = AsyncMock()
@@ -54,7 +53,6 @@ class TestGitIdentityConfiguration:
         assert git_user.name == "Jane Dev"
         assert git_user.email == "jane@example.com"
 
-    @pytest.mark.asyncio
     async def test_falls_back_when_both_missing(self, bridge: AgentBridge):
         """Should use fallback identity when both scmName and scmEmail are null."""
         bridge._configure_git_identity = AsyncMock()
@@ -83,7 +81,6 @@ class TestGitIdentityConfiguration:
         assert git_user.name == FALLBACK_GIT_USER.name
         assert git_user.email == FALLBACK_GIT_USER.email
 
-    @pytest.mark.asyncio
     async def test_falls_back_email_when_only_email_missing(self, bridge: AgentBridge):
         """Should use fallback email when scmEmail is null but scmName is present."""
         bridge._configure_git_identity = AsyncMock()
@@ -112,7 +109,6 @@ class TestGitIdentityConfiguration:
         assert git_user.name == "Jane Dev"
         assert git_user.email == FALLBACK_GIT_USER.email
 
-    @pytest.mark.asyncio
     async def test_falls_back_name_when_only_name_missing(self, bridge: AgentBridge):
         """Should use fallback name when scmName is null but scmEmail is present."""
         bridge._configure_git_identity = AsyncMock()
@@ -141,7 +137,6 @@ class TestGitIdentityConfiguration:
         assert git_user.name == FALLBACK_GIT_USER.name
         assert git_user.email == "jane@example.com"
 
-    @pytest.mark.asyncio
     async def test_falls_back_when_no_author_data(self, bridge: AgentBridge):
         """Should use fallback identity when author dict has no SCM fields."""
         bridge._configure_git_identity = AsyncMock()
@@ -179,7 +174,6 @@ class TestFallbackGitUserConstant:
 class TestConfigureGitIdentity:
     """Tests for non-blocking git identity configuration."""
 
-    @pytest.mark.asyncio
     async def test_configures_name_and_email_with_async_subprocess(
         self,
         bridge: AgentBridge,
@@ -229,7 +223,6 @@ class TestConfigureGitIdentity:
             ]
         )
 
-    @pytest.mark.asyncio
     async def test_logs_error_when_git_config_fails(
         self,
         bridge: AgentBridge,
@@ -255,7 +248,6 @@ class TestConfigureGitIdentity:
         bridge.log.error.assert_called_once()
         assert bridge.log.error.call_args.args[0] == "git.identity_error"
 
-    @pytest.mark.asyncio
     async def test_logs_error_when_git_config_times_out(
         self,
         bridge: AgentBridge,
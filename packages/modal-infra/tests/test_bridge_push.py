@@ -4,8 +4,6 @@ import asyncio
 from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock, patch
 
-import pytest
-
 from src.sandbox.bridge import AgentBridge
 
 
@@ -45,7 +43,6 @@ def _fake_process(returncode: int | None, communicate_result: tuple[bytes, bytes
     return process
 
 
-@pytest.mark.asyncio
 async def test_handle_push_sends_push_complete_on_success(tmp_path: Path):
     bridge = _create_bridge(tmp_path)
     bridge._send_event = AsyncMock()
@@ -67,7 +64,6 @@ async def test_handle_push_sends_push_complete_on_success(tmp_path: Path):
     process.kill.assert_not_called()
 
 
-@pytest.mark.asyncio
 async def test_handle_push_sends_auth_error_on_nonzero_exit(tmp_path: Path):
     bridge = _create_bridge(tmp_path)
     bridge._send_event = AsyncMock()
@@ -90,7 +86,6 @@ async def test_handle_push_sends_auth_error_on_nonzero_exit(tmp_path: Path):
     process.kill.assert_not_called()
 
 
-@pytest.mark.asyncio
 async def test_handle_push_timeout_terminates_process_and_sends_error(tmp_path: Path):
     bridge = _create_bridge(tmp_path)
     bridge._send_event = AsyncMock()
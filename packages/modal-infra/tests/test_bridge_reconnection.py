@@ -1,5 +1,7 @@
 """Tests for bridge reconnection and error handling logic."""
 
+import asyncio
+
 import pytest
 
 from src.sandbox.bridge import AgentBridge, SessionTerminatedError
@@ -48,6 +50,10 @@ class TestIsFatalConnectionError:
     def test_empty_string_is_not_fatal(self, bridge):
         assert bridge._is_fatal_connection_error("") is False
 
+    def test_other_4xx_is_not_fatal(self, bridge):
+        error_str = "server rejected WebSocket connection: HTTP 429"
+        assert bridge._is_fatal_connection_error(error_str) is False
+
 
 class TestSessionTerminatedError:
     """Tests for SessionTerminatedError exception."""
@@ -62,3 +68,35 @@ class TestSessionTerminatedError:
         with pytest.raises(SessionTerminatedError) as exc_info:
             raise SessionTerminatedError("Wrapped") from original
         assert exc_info.value.__cause__ is original
+
+
+class TestWaitForShutdown:
+    """Tests for the shutdown-aware sleep used by reconnect backoff and heartbeats."""
+
+    @pytest.fixture
+    def bridge(self):
+        return AgentBridge(
+            sandbox_id="test-sandbox",
+            session_id="test-session",
+            control_plane_url="https://example.com",
+            auth_token="test-token",
+        )
+
+    async def test_returns_false_after_timeout(self, bridge):
+        assert await bridge._wait_for_shutdown(0.01) is False
+
+    async def test_wakes_immediately_on_shutdown(self, bridge):
+        waiter = asyncio.create_task(bridge._wait_for_shutdown(3600))
+        await asyncio.sleep(0)
+
+        bridge.shutdown_event.set()
+
+        assert await asyncio.wait_for(waiter, timeout=1) is True
+
+    async def test_heartbeat_loop_exits_on_shutdown(self, bridge):
+        heartbeat = asyncio.create_task(bridge._heartbeat_loop())
+        await asyncio.sleep(0)
+
+        bridge.shutdown_event.set()
+
+        await asyncio.wait_for(heartbeat, timeout=1)
@@ -102,7 +102,6 @@ def opencode_message_id(monkeypatch) -> str:
 class TestSSEParser:
     """Tests for _parse_sse_stream method."""
 
-    @pytest.mark.asyncio
     async def test_parse_single_event(self, bridge: AgentBridge):
         """Should correctly parse a single SSE event."""
         events_text = [create_sse_event("server.connected", {})]
@@ -115,7 +114,6 @@ class TestSSEParser:
         assert len(events) == 1
         assert events[0]["type"] == "server.connected"
 
-    @pytest.mark.asyncio
     async def test_parse_multiple_events(self, bridge: AgentBridge):
         """Should correctly parse multiple SSE events."""
         events_text = [
@@ -145,7 +143,6 @@ class TestSSEParser:
         assert events[1]["type"] == "message.part.updated"
         assert events[2]["type"] == "session.idle"
 
-    @pytest.mark.asyncio
     async def test_parse_event_with_both_formats(self, bridge: AgentBridge):
         """Should handle both 'data: {...}' and 'data:{...}' formats."""
         events_text = [
@@ -166,7 +163,6 @@ class TestSSEParser:
 class TestSSEStreaming:
     """Tests for _stream_opencode_response_sse method."""
 
-    @pytest.mark.asyncio
     async def test_text_streaming_with_delta(self, bridge: AgentBridge, opencode_message_id: str):
         """Should accumulate text deltas correctly."""
         http_client = bridge.http_client
@@ -224,7 +220,6 @@ class TestSSEStreaming:
         assert token_events[0]["content"] == "Hello"
         assert token_events[1]["content"] == "Hello world"  # Cumulative
 
-    @pytest.mark.asyncio
     async def test_text_streaming_without_delta(
         self, bridge: AgentBridge, opencode_message_id: str
     ):
@@ -267,7 +262,6 @@ class TestSSEStreaming:
         assert len(token_events) == 1
         assert token_events[0]["content"] == "Full text content"
 
-    @pytest.mark.asyncio
     async def test_buffers_parts_until_message_updated(
         self, bridge: AgentBridge, opencode_message_id: str
     ):
@@ -310,7 +304,6 @@ class TestSSEStreaming:
         assert len(token_events) == 1
         assert token_events[0]["content"] == "Hello"
 
-    @pytest.mark.asyncio
     async def test_tool_events(self, bridge: AgentBridge, opencode_message_id: str):
         """Should emit tool events correctly."""
         http_client = bridge.http_client
@@ -376,7 +369,6 @@ class TestSSEStreaming:
         assert tool_events[0]["status"] == "running"
         assert tool_events[1]["status"] == "completed"
 
-    @pytest.mark.asyncio
     async def test_filters_other_sessions(self, bridge: AgentBridge, opencode_message_id: str):
         """Should filter out events from other sessions."""
         http_client = bridge.http_client
@@ -431,7 +423,6 @@ class TestSSEStreaming:
         assert len(token_events) == 1
         assert token_events[0]["content"] == "Our response"
 
-    @pytest.mark.asyncio
     async def test_completion_on_session_status_idle(
         self, bridge: AgentBridge, opencode_message_id: str
     ):
@@ -476,7 +467,6 @@ class TestSSEStreaming:
         assert len(events) == 1
         assert events[0]["type"] == "token"
 
-    @pytest.mark.asyncio
     async def test_handles_session_error(self, bridge: AgentBridge):
         """Should emit error event on session.error."""
         http_client = bridge.http_client
@@ -500,7 +490,6 @@ class TestSSEStreaming:
         assert events[0]["type"] == "error"
         assert events[0]["error"] == "Something went wrong"
 
-    @pytest.mark.asyncio
     async def test_message_id_comes_from_control_plane(
         self, bridge: AgentBridge, opencode_message_id: str
     ):
@@ -571,7 +560,6 @@ class TestFetchFinalMessageState:
         bridge.http_client = AsyncMock()
         return bridge
 
-    @pytest.mark.asyncio
     async def test_only_fetches_current_prompt_messages(self, bridge_with_mock_client: AgentBridge):
         """Should only emit text from messages whose parentID matches our opencode_message_id."""
         bridge = bridge_with_mock_client
@@ -605,7 +593,6 @@ class TestFetchFinalMessageState:
         assert events[0]["content"] == "Second response"
         assert events[0]["messageId"] == "cp-msg-2"
 
-    @pytest.mark.asyncio
     async def test_skips_messages_from_previous_prompts(self, bridge_with_mock_client: AgentBridge):
         """Should skip messages whose parentID doesn't match our opencode_message_id."""
         bridge = bridge_with_mock_client
@@ -632,7 +619,6 @@ class TestFetchFinalMessageState:
         # Should have no events since parentID doesn't match
         assert len(events) == 0
 
-    @pytest.mark.asyncio
     async def test_skips_text_already_sent(self, bridge_with_mock_client: AgentBridge):
         """Should skip text that's not longer than what was already sent."""
         bridge = bridge_with_mock_client
@@ -658,7 +644,6 @@ class TestFetchFinalMessageState:
         # Should have no events since text is not longer
         assert len(events) == 0
 
-    @pytest.mark.asyncio
     async def test_emits_longer_text(self, bridge_with_mock_client: AgentBridge):
         """Should emit text that's longer than what was already sent."""
         bridge = bridge_with_mock_client
@@ -685,7 +670,6 @@ class TestFetchFinalMessageState:
         assert len(events) == 1
         assert events[0]["content"] == "Hello world!"
 
-    @pytest.mark.asyncio
     async def test_skips_user_messages(self, bridge_with_mock_client: AgentBridge):
         """Should skip user messages (only process assistant messages)."""
         bridge = bridge_with_mock_client
@@ -763,7 +747,6 @@ class TestSSEFollowUpMessageBug:
     and filter based on assistant messages whose parentID matches that ID.
     """
 
-    @pytest.mark.asyncio
     async def test_second_prompt_shows_correct_response(self, bridge: AgentBridge, monkeypatch):
         """Second prompt should show its own response, not the first prompt's."""
         http_client = bridge.http_client
@@ -998,7 +981,6 @@ class DelayedMockHttpClient:
 class TestInactivityTimeout:
     """Tests for SSE inactivity timeout behavior."""
 
-    @pytest.mark.asyncio
     async def test_timeout_on_no_data(self):
         """Should raise RuntimeError when SSE stream hangs after connection."""
         bridge = AgentBridge(
@@ -1020,7 +1002,6 @@ class TestInactivityTimeout:
             async for _event in bridge._stream_opencode_response_sse("msg-1", "test"):
                 pass
 
-    @pytest.mark.asyncio
     async def test_timeout_resets_on_data(self, opencode_message_id: str):
         """Events spaced under the timeout window should complete successfully."""
         bridge = AgentBridge(
@@ -1094,7 +1075,6 @@ class TestInactivityTimeout:
         assert len(token_events) == 2
         assert token_events[-1]["content"] == "Hello world"
 
-    @pytest.mark.asyncio
     async def test_heartbeat_resets_timeout(self, opencode_message_id: str):
         """server.heartbeat events should keep the session alive."""
         bridge = AgentBridge(
@@ -1160,7 +1140,6 @@ class TestInactivityTimeout:
 class TestPromptMaxDuration:
     """Tests for prompt max duration timeout behavior."""
 
-    @pytest.mark.asyncio
     async def test_prompt_max_duration_timeout(self):
         """Prompt should stop when it exceeds max duration."""
         bridge = AgentBridge(
@@ -1195,7 +1174,6 @@ class TestPromptMaxDuration:
 class TestSubtaskStreaming:
     """Tests for child session (sub-task) event streaming through the bridge."""
 
-    @pytest.mark.asyncio
     async def test_child_session_tool_events_streamed(
         self, bridge: AgentBridge, opencode_message_id: str
     ):
@@ -1290,7 +1268,6 @@ class TestSubtaskStreaming:
         assert tool_events[1]["status"] == "completed"
         assert tool_events[1]["isSubtask"] is True
 
-    @pytest.mark.asyncio
     async def test_child_text_events_not_forwarded(
         self, bridge: AgentBridge, opencode_message_id: str
     ):
@@ -1353,7 +1330,6 @@ class TestSubtaskStreaming:
         token_events = [e for e in events if e["type"] == "token"]
         assert len(token_events) == 0
 
-    @pytest.mark.asyncio
     async def test_child_idle_does_not_terminate_stream(
         self, bridge: AgentBridge, opencode_message_id: str
     ):
@@ -1409,7 +1385,6 @@ class TestSubtaskStreaming:
         assert len(token_events) == 1
         assert token_events[0]["content"] == "Task result"
 
-    @pytest.mark.asyncio
     async def test_child_session_status_idle_does_not_terminate_stream(
         self, bridge: AgentBridge, opencode_message_id: str
     ):
@@ -1467,7 +1442,6 @@ class TestSubtaskStreaming:
         assert len(token_events) == 1
         assert token_events[0]["content"] == "Still going"
 
-    @pytest.mark.asyncio
     async def test_child_session_error_forwarded_without_termination(
         self, bridge: AgentBridge, opencode_message_id: str
     ):
@@ -1533,7 +1507,6 @@ class TestSubtaskStreaming:
         assert len(token_events) == 1
         assert token_events[0]["content"] == "Recovered from sub-task error"
 
-    @pytest.mark.asyncio
     async def test_child_message_buffering_race_condition(
         self, bridge: AgentBridge, opencode_message_id: str
     ):
@@ -1604,7 +1577,6 @@ class TestSubtaskStreaming:
         assert tool_events[0]["isSubtask"] is True
         assert tool_events[0]["tool"] == "Read"
 
-    @pytest.mark.asyncio
     async def test_resumed_child_session_discovered_via_metadata(
         self, bridge: AgentBridge, opencode_message_id: str
     ):
@@ -1691,7 +1663,6 @@ class TestSubtaskStreaming:
         assert child_tools[0]["tool"] == "Bash"
         assert child_tools[0]["isSubtask"] is True
 
-    @pytest.mark.asyncio
     async def test_parent_child_callid_collision(
         self, bridge: AgentBridge, opencode_message_id: str
     ):
@@ -1783,7 +1754,6 @@ class TestSubtaskStreaming:
         assert len(parent_tools) == 1
         assert len(child_tools) == 1
 
-    @pytest.mark.asyncio
     async def test_grandchild_session_not_tracked(
         self, bridge: AgentBridge, opencode_message_id: str
     ):
@@ -1875,7 +1845,6 @@ class TestCompactionHandling:
     The bridge must detect session.compacted and accept post-compaction messages.
     """
 
-    @pytest.mark.asyncio
     async def test_post_compaction_text_forwarded(
         self, bridge: AgentBridge, opencode_message_id: str
     ):
@@ -1964,7 +1933,6 @@ class TestCompactionHandling:
         assert token_events[0]["content"] == "Let me check..."
         assert token_events[1]["content"] == "Here is the answer."
 
-    @pytest.mark.asyncio
     async def test_compaction_summary_text_not_forwarded(
         self, bridge: AgentBridge, opencode_message_id: str
     ):
@@ -2027,7 +1995,6 @@ class TestCompactionHandling:
         token_events = [e for e in events if e["type"] == "token"]
         assert len(token_events) == 0
 
-    @pytest.mark.asyncio
     async def test_without_compaction_strict_parent_matching(
         self, bridge: AgentBridge, opencode_message_id: str
     ):
@@ -2071,7 +2038,6 @@ class TestCompactionHandling:
         token_events = [e for e in events if e["type"] == "token"]
         assert len(token_events) == 0
 
-    @pytest.mark.asyncio
     async def test_compaction_parts_buffered_before_message_updated(
         self, bridge: AgentBridge, opencode_message_id: str
     ):
@@ -2133,7 +2099,6 @@ class TestCompactionHandling:
         assert len(token_events) == 1
         assert token_events[0]["content"] == "Buffered text"
 
-    @pytest.mark.asyncio
     async def test_fetch_final_state_after_compaction(self):
         """_fetch_final_message_state with compaction_occurred should find post-compaction text."""
         bridge = AgentBridge(
@@ -2187,7 +2152,6 @@ class TestCompactionHandling:
         assert events[0]["content"] == "Here is the answer."
         assert events[0]["messageId"] == "cp-msg-1"
 
-    @pytest.mark.asyncio
     async def test_fetch_final_state_without_compaction_rejects_unknown(self):
         """_fetch_final_message_state without compaction should reject non-matching messages."""
         bridge = AgentBridge(
@@ -2226,7 +2190,6 @@ class TestCompactionHandling:
 
         assert len(events) == 0
 
-    @pytest.mark.asyncio
     async def test_child_compaction_does_not_affect_parent(
         self, bridge: AgentBridge, opencode_message_id: str
     ):
@@ -6,10 +6,9 @@ the task lifecycle correctly manages _current_prompt_task.
 """
 
 import asyncio
-import contextlib
 import json
 from typing import Any
-from unittest.mock import MagicMock
+from urllib.parse import urlsplit
 
 import pytest
 
@@ -26,11 +25,11 @@ class MockHttpClient:
         self.sse_events: list[str] = []
         self._post_call_count = 0
         self._get_call_count = 0
-        self.post_urls: list[str] = []
+        self.post_endpoints: set[str] = set()
 
     async def post(self, url: str, json: dict | None = None, timeout: float = 30.0) -> Any:
         self._post_call_count += 1
-        self.post_urls.append(url)
+        self.post_endpoints.add(urlsplit(url).path.rsplit("/", 1)[-1])
         if self.post_responses:
             return self.post_responses.pop(0)
         return MockResponse(204)
@@ -53,9 +52,10 @@ class MockSSEResponse:
         self._events = events
 
     async def aiter_text(self):
-        for event in self._events:
-            yield event
-            await asyncio.sleep(0)
+        # Each event already ends with the SSE "\n\n" separator, so the whole
+        # stream can be delivered as one chunk.
+        if self._events:
+            yield "".join(self._events)
 
     async def __aenter__(self):
         return self
@@ -70,6 +70,49 @@ def create_sse_event(event_type: str, properties: dict) -> str:
     return f"data: {json.dumps(data)}\n\n"
 
 
+SERVER_CONNECTED_SSE = create_sse_event("server.connected", {})
+SESSION_IDLE_SSE = create_sse_event("session.idle", {"sessionID": "oc-session-123"})
+
+
+class _FakeTask:
+    """Minimal stand-in for asyncio.Task exposing only done() and cancel()."""
+
+    __slots__ = ("_done", "cancelled")
+
+    def __init__(self, done: bool):
+        self._done = done
+        self.cancelled = False
+
+    def done(self) -> bool:
+        return self._done
+
+    def cancel(self) -> None:
+        self.cancelled = True
+
+
+class EventCollector:
+    """Stand-in for AgentBridge._send_event that records every event sent."""
+
+    def __init__(self):
+        self.events: list[dict[str, Any]] = []
+        self._received = asyncio.Event()
+
+    async def send(self, event: dict[str, Any]) -> None:
+        self.events.append(event)
+        self._received.set()
+
+    def of_type(self, event_type: str) -> list[dict[str, Any]]:
+        return [e for e in self.events if e.get("type") == event_type]
+
+    async def wait_for(self, event_type: str, timeout: float = 1.0) -> dict[str, Any]:
+        """Wait until an event of the given type has been sent and return the first one."""
+        async with asyncio.timeout(timeout):
+            while not (matches := self.of_type(event_type)):
+                self._received.clear()
+                await self._received.wait()
+        return matches[0]
+
+
 @pytest.fixture
 def bridge() -> AgentBridge:
     """Create a bridge instance for testing."""
@@ -87,18 +130,15 @@ def bridge() -> AgentBridge:
 class TestHandleStop:
     """Tests for _handle_stop and _current_prompt_task management."""
 
-    @pytest.mark.asyncio
     async def test_handle_stop_cancels_current_prompt_task(self, bridge: AgentBridge):
         """When a prompt task is running, _handle_stop should cancel it."""
-        mock_task = MagicMock(spec=asyncio.Task)
-        mock_task.done.return_value = False
+        mock_task = _FakeTask(done=False)
         bridge._current_prompt_task = mock_task
 
         await bridge._handle_stop()
 
-        mock_task.cancel.assert_called_once()
+        assert mock_task.cancelled is True
 
-    @pytest.mark.asyncio
     async def test_handle_stop_with_no_running_task(self, bridge: AgentBridge):
         """When no prompt task exists, _handle_stop should not error."""
         assert bridge._current_prompt_task is None
@@ -108,27 +148,24 @@ class TestHandleStop:
 
         # Still calls opencode abort (best-effort)
         http_client = bridge.http_client
-        assert any(url.endswith("/abort") for url in http_client.post_urls)
+        assert "abort" in http_client.post_endpoints
 
-    @pytest.mark.asyncio
     async def test_handle_stop_with_completed_task(self, bridge: AgentBridge):
         """When prompt task is already done, cancel() should NOT be called."""
-        mock_task = MagicMock(spec=asyncio.Task)
-        mock_task.done.return_value = True
+        mock_task = _FakeTask(done=True)
         bridge._current_prompt_task = mock_task
 
         await bridge._handle_stop()
 
-        mock_task.cancel.assert_not_called()
+        assert mock_task.cancelled is False
 
-    @pytest.mark.asyncio
     async def test_prompt_task_cleared_on_completion(self, bridge: AgentBridge):
         """After a prompt completes normally, _current_prompt_task should be None."""
         http_client = bridge.http_client
 
         http_client.sse_events = [
-            create_sse_event("server.connected", {}),
-            create_sse_event("session.idle", {"sessionID": "oc-session-123"}),
+            SERVER_CONNECTED_SSE,
+            SESSION_IDLE_SSE,
         ]
 
         # _handle_command returns None for prompts (decoupled from WS lifecycle)
@@ -153,15 +190,14 @@ class TestHandleStop:
 
         assert bridge._current_prompt_task is None
 
-    @pytest.mark.asyncio
     async def test_prompt_task_set_when_created(self, bridge: AgentBridge):
         """_handle_command('prompt') should set _current_prompt_task immediately."""
         http_client = bridge.http_client
 
         # SSE events that complete immediately
         http_client.sse_events = [
-            create_sse_event("server.connected", {}),
-            create_sse_event("session.idle", {"sessionID": "oc-session-123"}),
+            SERVER_CONNECTED_SSE,
+            SESSION_IDLE_SSE,
         ]
 
         result = await bridge._handle_command(
@@ -183,7 +219,6 @@ class TestHandleStop:
         await task
         await asyncio.sleep(0)
 
-    @pytest.mark.asyncio
     async def test_older_prompt_completion_does_not_clear_newer_task(self, bridge: AgentBridge):
         """Completing an older prompt must not clear a newer _current_prompt_task."""
         old_can_finish = asyncio.Event()
@@ -231,15 +266,11 @@ class TestHandleStop:
         await new_task
         await asyncio.sleep(0)
 
-    @pytest.mark.asyncio
     async def test_cancelled_task_sends_execution_complete(self, bridge: AgentBridge):
         """Cancelling the prompt task should trigger execution_complete with success=False."""
-        sent_events: list[dict] = []
-
-        async def capture_send(event: dict) -> None:
-            sent_events.append(event)
-
-        bridge._send_event = capture_send
+        collector = EventCollector()
+        started = asyncio.Event()
+        bridge._send_event = collector.send
 
         http_client = bridge.http_client
 
@@ -248,7 +279,8 @@ class TestHandleStop:
             status_code = 200
 
             async def aiter_text(self):
-                yield create_sse_event("server.connected", {})
+                yield SERVER_CONNECTED_SSE
+                started.set()
                 await asyncio.sleep(3600)
 
             async def __aenter__(self):
@@ -270,24 +302,52 @@ class TestHandleStop:
         task = bridge._current_prompt_task
         assert task is not None
 
-        # Let the task start
-        await asyncio.sleep(0.05)
+        # Wait until the prompt is blocked reading the SSE stream
+        await asyncio.wait_for(started.wait(), timeout=1.0)
 
         # Cancel it
         task.cancel()
-        with contextlib.suppress(asyncio.CancelledError):
-            await task
+        # Only completion matters here; wait() does not re-raise the cancellation
+        await asyncio.wait({task})
+        assert task.cancelled()
 
-        # Give the done callback a chance to fire and the
-        # inner asyncio.create_task to run
-        await asyncio.sleep(0.1)
+        # Wait for the done callback's execution_complete to be sent
+        await collector.wait_for("execution_complete")
 
         # Verify execution_complete was sent with success=False
-        exec_complete = [e for e in sent_events if e.get("type") == "execution_complete"]
+        exec_complete = collector.of_type("execution_complete")
         assert len(exec_complete) == 1
         assert exec_complete[0]["messageId"] == "msg-cancel-test"
         assert exec_complete[0]["success"] is False
 
 
+class TestCommandDispatch:
+    """Tests for _handle_command routing."""
+
+    async def test_stop_command_routes_to_handle_stop(self, bridge: AgentBridge):
+        """Dispatch should honour per-instance handler overrides."""
+        calls: list[str] = []
+
+        async def fake_stop() -> None:
+            calls.append("stop")
+
+        bridge._handle_stop = fake_stop
+
+        assert await bridge._handle_command({"type": "stop"}) is None
+        assert calls == ["stop"]
+
+    async def test_git_sync_complete_sets_event(self, bridge: AgentBridge):
+        assert not bridge.git_sync_complete.is_set()
+
+        await bridge._handle_command({"type": "git_sync_complete"})
+
+        assert bridge.git_sync_complete.is_set()
+
+    async def test_unknown_command_ignored(self, bridge: AgentBridge):
+        assert await bridge._handle_command({"type": "does-not-exist"}) is None
+        assert await bridge._handle_command({}) is None
+        assert await bridge._handle_command({"type": ["prompt"]}) is None
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -1,10 +1,11 @@
 """Tests for entrypoint IMAGE_BUILD_MODE and FROM_REPO_IMAGE branching."""
 
-import os
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, patch
 
 import pytest
 
+from src.sandbox.entrypoint import SandboxSupervisor
+
 
 @pytest.fixture
 def base_env():
@@ -33,36 +34,88 @@ def repo_image_env(base_env):
     }
 
 
-def _make_supervisor(env_vars: dict):
-    """Create a SandboxSupervisor with the given env vars patched in."""
-    with patch.dict(os.environ, env_vars, clear=False):
-        from src.sandbox.entrypoint import SandboxSupervisor
+@pytest.fixture
+def snapshot_env(base_env):
+    """Env vars for a sandbox restored from a snapshot."""
+    return {**base_env, "RESTORED_FROM_SNAPSHOT": "true"}
+
+
+def _make_supervisor(env_vars: dict, monkeypatch: pytest.MonkeyPatch) -> SandboxSupervisor:
+    """Create a SandboxSupervisor with the given env vars set for the rest of the test."""
+    for key, value in env_vars.items():
+        monkeypatch.setenv(key, value)
+    # run() exports the boot mode; register it so monkeypatch restores it afterwards
+    monkeypatch.delenv("OPENINSPECT_BOOT_MODE", raising=False)
+    return SandboxSupervisor()
+
+
+class _OkProcess:
+    """Finished subprocess stand-in that exits 0 with no output."""
+
+    __slots__ = ()
+
+    returncode = 0
+
+    async def communicate(self, input: bytes | None = None) -> tuple[bytes, bytes]:
+        return b"", b""
+
+    async def wait(self) -> int:
+        return 0
+
+
+# Stateless, so every mocked create_subprocess_exec call can share it
+_OK_PROC = _OkProcess()
+
+
+_LIFECYCLE_HOOKS = ("run_setup_script", "run_start_script")
+_LIFECYCLE_METHODS = ("start_opencode", "start_bridge")
+
 
-        return SandboxSupervisor()
+@pytest.fixture(autouse=True)
+def _stub_supervisor_teardown(monkeypatch):
+    """Stub the process monitor loop and the shutdown run() always ends with."""
+    monkeypatch.setattr(SandboxSupervisor, "monitor_processes", AsyncMock())
+    monkeypatch.setattr(SandboxSupervisor, "shutdown", AsyncMock())
 
 
+def _mock_lifecycle(supervisor, **hook_results: bool) -> None:
+    """Replace the supervisor's hooks and OpenCode/bridge startup with AsyncMocks.
+
+    Setup/start hooks succeed unless overridden, e.g. ``run_start_script=False``.
+    """
+    for name in _LIFECYCLE_HOOKS:
+        setattr(supervisor, name, AsyncMock(return_value=hook_results.get(name, True)))
+    for name in _LIFECYCLE_METHODS:
+        setattr(supervisor, name, AsyncMock())
+
+
+@pytest.fixture
+def patched_supervisor(request, monkeypatch):
+    """Supervisor for the env fixture named by ``request.param`` with every boot step mocked.
+
+    Git sync variants and hooks succeed; tests override only what they exercise.
+    """
+    supervisor = _make_supervisor(request.getfixturevalue(request.param), monkeypatch)
+    supervisor.perform_git_sync = AsyncMock(return_value=True)
+    supervisor._incremental_git_sync = AsyncMock(return_value=True)
+    supervisor._quick_git_fetch = AsyncMock()
+    _mock_lifecycle(supervisor)
+    supervisor._report_fatal_error = AsyncMock()
+    # In build mode, entrypoint waits for shutdown_event (builder terminates sandbox).
+    # Pre-set so the test doesn't hang.
+    supervisor.shutdown_event.set()
+    return supervisor
+
+
+@pytest.mark.parametrize("patched_supervisor", ["build_env"], indirect=True)
 class TestImageBuildMode:
     """IMAGE_BUILD_MODE=true: setup only, don't run start/OpenCode/bridge."""
 
-    @pytest.mark.asyncio
-    async def test_exits_after_setup(self, build_env):
+    async def test_exits_after_setup(self, patched_supervisor):
         """Should return from run() after git sync + setup, before OpenCode."""
-        supervisor = _make_supervisor(build_env)
-
-        supervisor.perform_git_sync = AsyncMock(return_value=True)
-
-        supervisor.run_setup_script = AsyncMock(return_value=True)
-        supervisor.run_start_script = AsyncMock(return_value=True)
-        supervisor.start_opencode = AsyncMock()
-        supervisor.start_bridge = AsyncMock()
-        supervisor.monitor_processes = AsyncMock()
-        supervisor.shutdown = AsyncMock()
-        # In build mode, entrypoint waits for shutdown_event (builder terminates sandbox).
-        # Pre-set so the test doesn't hang.
-        supervisor.shutdown_event.set()
+        supervisor = patched_supervisor
 
-        with patch.dict(os.environ, build_env, clear=False):
-            await supervisor.run()
+        await supervisor.run()
 
         supervisor.perform_git_sync.assert_called_once()
         supervisor.run_setup_script.assert_called_once()
@@ -72,295 +125,149 @@ class TestImageBuildMode:
         supervisor.start_bridge.assert_not_called()
         supervisor.monitor_processes.assert_not_called()
 
-    @pytest.mark.asyncio
-    async def test_clone_depth_100(self, build_env, tmp_path):
-        """Build mode should clone with --depth 100, not --depth 1."""
-        supervisor = _make_supervisor(build_env)
-        # Point repo_path to a non-existent dir so clone branch is taken
-        supervisor.repo_path = tmp_path / "nonexistent"
-        # Pre-set so entrypoint doesn't hang waiting for builder to terminate
-        supervisor.shutdown_event.set()
-
-        all_calls = []
-
-        async def fake_subprocess(*args, **kwargs):
-            all_calls.append(args)
-            mock_proc = MagicMock()
-            mock_proc.communicate = AsyncMock(return_value=(b"", b""))
-            mock_proc.wait = AsyncMock(return_value=0)
-            mock_proc.returncode = 0
-            return mock_proc
-
-        supervisor.run_setup_script = AsyncMock(return_value=True)
-        supervisor.run_start_script = AsyncMock(return_value=True)
-        supervisor.shutdown = AsyncMock()
-
-        with (
-            patch.dict(os.environ, build_env, clear=False),
-            patch(
-                "src.sandbox.entrypoint.asyncio.create_subprocess_exec",
-                side_effect=fake_subprocess,
-            ),
-        ):
-            await supervisor.run()
-
-        # Find the clone command (the one with "clone" in the args)
-        clone_calls = [args for args in all_calls if "clone" in args]
-        assert len(clone_calls) >= 1, f"Expected a git clone call, got: {all_calls}"
-        clone_args = clone_calls[0]
-        assert "100" in clone_args, f"Expected --depth 100 in clone args, got {clone_args}"
-        assert "1" not in clone_args, "Build mode should not use --depth 1"
-
-    @pytest.mark.asyncio
-    async def test_setup_script_runs_in_build_mode(self, build_env):
+    async def test_setup_script_runs_in_build_mode(self, patched_supervisor):
         """Setup script should run in build mode (it IS the build)."""
-        supervisor = _make_supervisor(build_env)
-
-        supervisor.perform_git_sync = AsyncMock(return_value=True)
-
-        supervisor.run_setup_script = AsyncMock(return_value=True)
-        supervisor.run_start_script = AsyncMock(return_value=True)
-        supervisor.shutdown = AsyncMock()
-        # Pre-set so entrypoint doesn't hang waiting for builder to terminate
-        supervisor.shutdown_event.set()
+        supervisor = patched_supervisor
 
-        with patch.dict(os.environ, build_env, clear=False):
-            await supervisor.run()
+        await supervisor.run()
 
         supervisor.run_setup_script.assert_called_once()
         supervisor.run_start_script.assert_not_called()
 
-    @pytest.mark.asyncio
-    async def test_setup_failure_is_fatal_in_build_mode(self, build_env):
+    async def test_setup_failure_is_fatal_in_build_mode(self, patched_supervisor):
         """Build mode should fail fast when setup hook fails."""
-        supervisor = _make_supervisor(build_env)
+        supervisor = patched_supervisor
+        supervisor.run_setup_script.return_value = False
 
-        supervisor.perform_git_sync = AsyncMock(return_value=True)
-        supervisor.run_setup_script = AsyncMock(return_value=False)
-        supervisor.run_start_script = AsyncMock(return_value=True)
-        supervisor.start_opencode = AsyncMock()
-        supervisor.start_bridge = AsyncMock()
-        supervisor.monitor_processes = AsyncMock()
-        supervisor.shutdown = AsyncMock()
-        supervisor._report_fatal_error = AsyncMock()
-
-        with patch.dict(os.environ, build_env, clear=False):
-            await supervisor.run()
+        await supervisor.run()
 
         supervisor._report_fatal_error.assert_called_once()
         supervisor.start_opencode.assert_not_called()
         supervisor.start_bridge.assert_not_called()
 
 
+@pytest.mark.parametrize("patched_supervisor", ["repo_image_env"], indirect=True)
 class TestFromRepoImage:
     """FROM_REPO_IMAGE=true: incremental sync + start hook, skip setup."""
 
-    @pytest.mark.asyncio
-    async def test_uses_incremental_sync(self, repo_image_env):
+    async def test_uses_incremental_sync(self, patched_supervisor):
         """Should call _incremental_git_sync instead of perform_git_sync."""
-        supervisor = _make_supervisor(repo_image_env)
-
-        supervisor.perform_git_sync = AsyncMock(return_value=True)
-        supervisor._incremental_git_sync = AsyncMock(return_value=True)
-        supervisor._quick_git_fetch = AsyncMock()
+        supervisor = patched_supervisor
 
-        supervisor.run_setup_script = AsyncMock(return_value=True)
-        supervisor.run_start_script = AsyncMock(return_value=True)
-        supervisor.start_opencode = AsyncMock()
-        supervisor.start_bridge = AsyncMock()
-        supervisor.monitor_processes = AsyncMock()
-        supervisor.shutdown = AsyncMock()
-
-        with patch.dict(os.environ, repo_image_env, clear=False):
-            await supervisor.run()
+        await supervisor.run()
 
         supervisor._incremental_git_sync.assert_called_once()
         supervisor.perform_git_sync.assert_not_called()
         supervisor._quick_git_fetch.assert_not_called()
 
-    @pytest.mark.asyncio
-    async def test_skips_setup_and_runs_start_script(self, repo_image_env):
+    async def test_skips_setup_and_runs_start_script(self, patched_supervisor):
         """Setup is skipped for repo images, but start hook still runs."""
-        supervisor = _make_supervisor(repo_image_env)
-
-        supervisor._incremental_git_sync = AsyncMock(return_value=True)
+        supervisor = patched_supervisor
 
-        supervisor.run_setup_script = AsyncMock(return_value=True)
-        supervisor.run_start_script = AsyncMock(return_value=True)
-        supervisor.start_opencode = AsyncMock()
-        supervisor.start_bridge = AsyncMock()
-        supervisor.monitor_processes = AsyncMock()
-        supervisor.shutdown = AsyncMock()
-
-        with patch.dict(os.environ, repo_image_env, clear=False):
-            await supervisor.run()
+        await supervisor.run()
 
         supervisor.run_setup_script.assert_not_called()
         supervisor.run_start_script.assert_called_once()
 
-    @pytest.mark.asyncio
-    async def test_starts_opencode_and_bridge(self, repo_image_env):
+    async def test_starts_opencode_and_bridge(self, patched_supervisor):
         """Should still start OpenCode and bridge (unlike build mode)."""
-        supervisor = _make_supervisor(repo_image_env)
-
-        supervisor._incremental_git_sync = AsyncMock(return_value=True)
-
-        supervisor.run_start_script = AsyncMock(return_value=True)
-        supervisor.start_opencode = AsyncMock()
-        supervisor.start_bridge = AsyncMock()
-        supervisor.monitor_processes = AsyncMock()
-        supervisor.shutdown = AsyncMock()
+        supervisor = patched_supervisor
 
-        with patch.dict(os.environ, repo_image_env, clear=False):
-            await supervisor.run()
+        await supervisor.run()
 
         supervisor.start_opencode.assert_called_once()
         supervisor.start_bridge.assert_called_once()
 
-    @pytest.mark.asyncio
-    async def test_start_script_failure_is_fatal(self, repo_image_env):
+    async def test_start_script_failure_is_fatal(self, patched_supervisor):
         """Repo-image boot should fail fast when start hook fails."""
-        supervisor = _make_supervisor(repo_image_env)
+        supervisor = patched_supervisor
+        supervisor.run_start_script.return_value = False
 
-        supervisor._incremental_git_sync = AsyncMock(return_value=True)
-        supervisor.run_setup_script = AsyncMock(return_value=True)
-        supervisor.run_start_script = AsyncMock(return_value=False)
-        supervisor.start_opencode = AsyncMock()
-        supervisor.start_bridge = AsyncMock()
-        supervisor.monitor_processes = AsyncMock()
-        supervisor.shutdown = AsyncMock()
-        supervisor._report_fatal_error = AsyncMock()
-
-        with patch.dict(os.environ, repo_image_env, clear=False):
-            await supervisor.run()
+        await supervisor.run()
 
         supervisor._report_fatal_error.assert_called_once()
         supervisor.start_opencode.assert_not_called()
         supervisor.start_bridge.assert_not_called()
 
 
+@pytest.mark.parametrize("patched_supervisor", ["base_env"], indirect=True)
 class TestNormalMode:
     """No build mode or repo image flags: full clone + setup + start + OpenCode."""
 
-    @pytest.mark.asyncio
-    async def test_uses_full_git_sync(self, base_env):
+    async def test_uses_full_git_sync(self, patched_supervisor):
         """Should use perform_git_sync (full clone)."""
-        supervisor = _make_supervisor(base_env)
-
-        supervisor.perform_git_sync = AsyncMock(return_value=True)
-        supervisor._incremental_git_sync = AsyncMock(return_value=True)
-        supervisor._quick_git_fetch = AsyncMock()
+        supervisor = patched_supervisor
 
-        supervisor.run_setup_script = AsyncMock(return_value=True)
-        supervisor.run_start_script = AsyncMock(return_value=True)
-        supervisor.start_opencode = AsyncMock()
-        supervisor.start_bridge = AsyncMock()
-        supervisor.monitor_processes = AsyncMock()
-        supervisor.shutdown = AsyncMock()
-
-        with patch.dict(os.environ, base_env, clear=False):
-            await supervisor.run()
+        await supervisor.run()
 
         supervisor.perform_git_sync.assert_called_once()
         supervisor._incremental_git_sync.assert_not_called()
         supervisor._quick_git_fetch.assert_not_called()
 
-    @pytest.mark.asyncio
-    async def test_runs_setup_script(self, base_env):
+    async def test_runs_setup_script(self, patched_supervisor):
         """Setup script should run in normal mode."""
-        supervisor = _make_supervisor(base_env)
-
-        supervisor.perform_git_sync = AsyncMock(return_value=True)
+        supervisor = patched_supervisor
 
-        supervisor.run_setup_script = AsyncMock(return_value=True)
-        supervisor.run_start_script = AsyncMock(return_value=True)
-        supervisor.start_opencode = AsyncMock()
-        supervisor.start_bridge = AsyncMock()
-        supervisor.monitor_processes = AsyncMock()
-        supervisor.shutdown = AsyncMock()
-
-        with patch.dict(os.environ, base_env, clear=False):
-            await supervisor.run()
+        await supervisor.run()
 
         supervisor.run_setup_script.assert_called_once()
         supervisor.run_start_script.assert_called_once()
 
-    @pytest.mark.asyncio
-    async def test_clone_depth_1(self, base_env, tmp_path):
-        """Normal mode should clone with --depth 1."""
-        supervisor = _make_supervisor(base_env)
+
+class TestCloneDepth:
+    """Clone depth depends on the boot mode."""
+
+    @pytest.mark.parametrize(
+        ("env_fixture", "depth"),
+        [("build_env", "100"), ("base_env", "1")],
+        ids=["build_mode", "normal_mode"],
+    )
+    @patch("src.sandbox.entrypoint.asyncio.create_subprocess_exec")
+    async def test_clone_depth(self, mock_exec, request, monkeypatch, tmp_path, env_fixture, depth):
+        """Build mode clones with --depth 100; normal mode with --depth 1."""
+        env = request.getfixturevalue(env_fixture)
+        supervisor = _make_supervisor(env, monkeypatch)
+        # Point repo_path to a non-existent dir so clone branch is taken
         supervisor.repo_path = tmp_path / "nonexistent"
+        # Pre-set so build mode doesn't hang waiting for builder to terminate
+        supervisor.shutdown_event.set()
 
         all_calls = []
 
         async def fake_subprocess(*args, **kwargs):
             all_calls.append(args)
-            mock_proc = MagicMock()
-            mock_proc.communicate = AsyncMock(return_value=(b"", b""))
-            mock_proc.wait = AsyncMock(return_value=0)
-            mock_proc.returncode = 0
-            return mock_proc
-
-        supervisor.run_setup_script = AsyncMock(return_value=True)
-        supervisor.run_start_script = AsyncMock(return_value=True)
-        supervisor.start_opencode = AsyncMock()
-        supervisor.start_bridge = AsyncMock()
-        supervisor.monitor_processes = AsyncMock()
-        supervisor.shutdown = AsyncMock()
-
-        with (
-            patch.dict(os.environ, base_env, clear=False),
-            patch(
-                "src.sandbox.entrypoint.asyncio.create_subprocess_exec",
-                side_effect=fake_subprocess,
-            ),
-        ):
-            await supervisor.run()
+            return _OK_PROC
+
+        mock_exec.side_effect = fake_subprocess
+        _mock_lifecycle(supervisor)
+
+        await supervisor.run()
 
-        # Find the clone command
+        # Find the clone command (the one with "clone" in the args)
         clone_calls = [args for args in all_calls if "clone" in args]
         assert len(clone_calls) >= 1, f"Expected a git clone call, got: {all_calls}"
         clone_args = clone_calls[0]
-        assert "1" in clone_args, f"Expected --depth 1 in clone args, got {clone_args}"
-        assert "100" not in clone_args, "Normal mode should not use --depth 100"
+        depth_arg = clone_args[clone_args.index("--depth") + 1]
+        assert depth_arg == depth, f"Expected --depth {depth} in clone args, got {clone_args}"
 
 
+@pytest.mark.parametrize("patched_supervisor", ["snapshot_env"], indirect=True)
 class TestSnapshotRestoreMode:
     """RESTORED_FROM_SNAPSHOT=true: quick fetch + start hook, skip setup."""
 
-    @pytest.mark.asyncio
-    async def test_skips_setup_and_runs_start(self, base_env):
-        supervisor = _make_supervisor({**base_env, "RESTORED_FROM_SNAPSHOT": "true"})
-
-        supervisor._quick_git_fetch = AsyncMock()
-        supervisor.run_setup_script = AsyncMock(return_value=True)
-        supervisor.run_start_script = AsyncMock(return_value=True)
-        supervisor.start_opencode = AsyncMock()
-        supervisor.start_bridge = AsyncMock()
-        supervisor.monitor_processes = AsyncMock()
-        supervisor.shutdown = AsyncMock()
+    async def test_skips_setup_and_runs_start(self, patched_supervisor):
+        supervisor = patched_supervisor
 
-        with patch.dict(os.environ, {"RESTORED_FROM_SNAPSHOT": "true"}, clear=False):
-            await supervisor.run()
+        await supervisor.run()
 
         supervisor.run_setup_script.assert_not_called()
         supervisor.run_start_script.assert_called_once()
 
-    @pytest.mark.asyncio
-    async def test_start_failure_is_fatal(self, base_env):
-        supervisor = _make_supervisor({**base_env, "RESTORED_FROM_SNAPSHOT": "true"})
-
-        supervisor._quick_git_fetch = AsyncMock()
-        supervisor.run_setup_script = AsyncMock(return_value=True)
-        supervisor.run_start_script = AsyncMock(return_value=False)
-        supervisor.start_opencode = AsyncMock()
-        supervisor.start_bridge = AsyncMock()
-        supervisor.monitor_processes = AsyncMock()
-        supervisor.shutdown = AsyncMock()
-        supervisor._report_fatal_error = AsyncMock()
+    async def test_start_failure_is_fatal(self, patched_supervisor):
+        supervisor = patched_supervisor
+        supervisor.run_start_script.return_value = False
 
-        with patch.dict(os.environ, {"RESTORED_FROM_SNAPSHOT": "true"}, clear=False):
-            await supervisor.run()
+        await supervisor.run()
 
         supervisor._report_fatal_error.assert_called_once()
         supervisor.start_opencode.assert_not_called()
@@ -369,10 +276,9 @@ class TestSnapshotRestoreMode:
 class TestIncrementalGitSync:
     """Test _incremental_git_sync() method directly."""
 
-    @pytest.mark.asyncio
-    async def test_fetches_and_resets(self, base_env, tmp_path):
+    async def test_fetches_and_resets(self, base_env, tmp_path, monkeypatch):
         """Should fetch from origin and hard reset to latest."""
-        supervisor = _make_supervisor({**base_env, "VCS_CLONE_TOKEN": "test-token"})
+        supervisor = _make_supervisor({**base_env, "VCS_CLONE_TOKEN": "test-token"}, monkeypatch)
         # Point repo_path to an existing directory so the method proceeds
         supervisor.repo_path = tmp_path
 
@@ -380,10 +286,7 @@ class TestIncrementalGitSync:
 
         async def fake_subprocess(*args, **kwargs):
             call_log.append(args)
-            mock_proc = MagicMock()
-            mock_proc.communicate = AsyncMock(return_value=(b"", b""))
-            mock_proc.returncode = 0
-            return mock_proc
+            return _OK_PROC
 
         with patch(
             "src.sandbox.entrypoint.asyncio.create_subprocess_exec",
@@ -408,10 +311,9 @@ class TestIncrementalGitSync:
         assert "reset" in call_log[2]
         assert "--hard" in call_log[2]
 
-    @pytest.mark.asyncio
-    async def test_skips_when_no_repo_path(self, base_env, tmp_path):
+    async def test_skips_when_no_repo_path(self, base_env, tmp_path, monkeypatch):
         """Should return False and set git_sync_complete when repo doesn't exist."""
-        supervisor = _make_supervisor(base_env)
+        supervisor = _make_supervisor(base_env, monkeypatch)
         supervisor.repo_path = tmp_path / "nonexistent"
 
         result = await supervisor._incremental_git_sync()
@@ -419,10 +321,9 @@ class TestIncrementalGitSync:
         assert result is False
         assert supervisor.git_sync_complete.is_set()
 
-    @pytest.mark.asyncio
-    async def test_skips_set_url_without_token(self, base_env, tmp_path):
+    async def test_skips_set_url_without_token(self, base_env, tmp_path, monkeypatch):
         """Should skip git remote set-url when no clone token."""
-        supervisor = _make_supervisor(base_env)
+        supervisor = _make_supervisor(base_env, monkeypatch)
         supervisor.vcs_clone_token = ""
         supervisor.repo_path = tmp_path
 
@@ -430,10 +331,7 @@ class TestIncrementalGitSync:
 
         async def fake_subprocess(*args, **kwargs):
             call_log.append(args)
-            mock_proc = MagicMock()
-            mock_proc.communicate = AsyncMock(return_value=(b"", b""))
-            mock_proc.returncode = 0
-            return mock_proc
+            return _OK_PROC
 
         with patch(
             "src.sandbox.entrypoint.asyncio.create_subprocess_exec",
@@ -1,20 +1,50 @@
 """Tests for the async image builder (v2)."""
 
+import asyncio
+import hashlib
+import hmac
 import json
+import re
 import time
+from types import SimpleNamespace
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import httpx
 import pytest
 
+from src.auth import internal
 from src.auth.internal import generate_internal_token, verify_internal_token
+from src.scheduler import image_builder
 from src.scheduler.image_builder import (
     CALLBACK_BACKOFF_BASE,
-    CALLBACK_MAX_RETRIES,
+    CALLBACK_BACKOFF_MAX,
     BuildError,
+    _api_get,
     _callback_with_retry,
+    _close_client,
+    _get_client,
     _stream_build_logs,
 )
+from tests.conftest import MockResponse
+
+# Prebuilt status errors raised by mocked callback responses
+_CALLBACK_REQUEST = httpx.Request("POST", "http://test")
+_HTTP_401 = httpx.HTTPStatusError("401", request=_CALLBACK_REQUEST, response=httpx.Response(401))
+_HTTP_404 = httpx.HTTPStatusError("404", request=_CALLBACK_REQUEST, response=httpx.Response(404))
+_HTTP_429 = httpx.HTTPStatusError("429", request=_CALLBACK_REQUEST, response=httpx.Response(429))
+_HTTP_500 = httpx.HTTPStatusError("500", request=_CALLBACK_REQUEST, response=httpx.Response(500))
+
+_TOKEN_RE = re.compile(r"\d+\.[0-9a-f]{64}")
+
+# Fixed clock for tests that need a deterministic token
+FROZEN_TIME_NS = 1_700_000_000_123_456_789
+
+
+@pytest.fixture(scope="session")
+def internal_token() -> str:
+    """Token for "test-secret" signed at FROZEN_TIME_NS."""
+    with patch("src.auth.internal.time.time_ns", return_value=FROZEN_TIME_NS):
+        return generate_internal_token("test-secret")
 
 
 class TestGenerateInternalToken:
@@ -25,84 +55,198 @@ class TestGenerateInternalToken:
         secret = "test-secret-key"
         token = generate_internal_token(secret)
 
-        # Token format: timestamp.signature
-        parts = token.split(".")
-        assert len(parts) == 2
-
-        timestamp_str, signature = parts
-        assert timestamp_str.isdigit()
-        assert len(signature) == 64  # SHA-256 hex
+        # Token format: <timestamp ms>.<SHA-256 hex signature>
+        assert _TOKEN_RE.fullmatch(token)
 
         # Token should verify
         auth_header = f"Bearer {token}"
         assert verify_internal_token(auth_header, secret) is True
 
+    def test_token_rejected_outside_validity_window(self):
+        """Tokens older or newer than the validity window should be rejected."""
+        window_ms = internal.TOKEN_VALIDITY_SECONDS * 1000
+        now_ms = 1_700_000_000_000
+        with patch("src.auth.internal.time.time_ns", return_value=now_ms * 1_000_000):
+            for token_ms, expected in (
+                (now_ms - window_ms, True),
+                (now_ms + window_ms, True),
+                (now_ms - window_ms - 1, False),
+                (now_ms + window_ms + 1, False),
+            ):
+                signature = internal._hmac_sha256(b"test-secret", b"%d" % token_ms).hex()
+                auth_header = f"Bearer {token_ms}.{signature}"
+                assert verify_internal_token(auth_header, "test-secret") is expected
+
     def test_token_rejected_with_wrong_secret(self):
         """Token should fail verification with different secret."""
         token = generate_internal_token("secret-1")
         auth_header = f"Bearer {token}"
         assert verify_internal_token(auth_header, "secret-2") is False
 
-    def test_timestamp_is_milliseconds(self):
-        """Token timestamp should be in milliseconds."""
+    def test_token_rejected_with_malformed_signature(self):
+        """Non-hex, non-lowercase or wrong-length signatures should be rejected, not raise."""
+        timestamp_str, signature = generate_internal_token("test-secret").split(".")
+
+        for bad in (
+            "z" * 64,
+            signature[:-2],
+            signature + "00",
+            " " + signature[1:],
+            signature.upper(),
+        ):
+            assert verify_internal_token(f"Bearer {timestamp_str}.{bad}", "test-secret") is False
+
+    def test_token_rejected_with_wrong_part_count(self):
+        """Tokens must have exactly a timestamp and a signature."""
         token = generate_internal_token("test-secret")
-        timestamp_str = token.split(".")[0]
-        timestamp_ms = int(timestamp_str)
 
-        # Should be within 1 second of current time in milliseconds
-        now_ms = int(time.time() * 1000)
-        assert abs(now_ms - timestamp_ms) < 1000
+        for bad in (token.replace(".", ""), f"{token}.extra", f"x.{token}"):
+            assert verify_internal_token(f"Bearer {bad}", "test-secret") is False
+
+    def test_token_rejected_with_malformed_timestamp(self):
+        """Timestamps must be plain ASCII digits of a plausible length."""
+        timestamp_str, signature = generate_internal_token("test-secret").split(".")
+
+        for bad in (
+            f"+{timestamp_str}",
+            f" {timestamp_str}",
+            timestamp_str.replace("1", "\u0661"),  # Arabic-Indic digit
+            "1" * 17,
+            "123",
+            "",
+        ):
+            assert verify_internal_token(f"Bearer {bad}.{signature}", "test-secret") is False
+
+    def test_signature_matches_reference_hmac(self):
+        """Signature should be a plain HMAC-SHA256 of the timestamp."""
+        secret = "test-secret-key"
+        timestamp_str, signature = generate_internal_token(secret).split(".")
+
+        expected = hmac.new(secret.encode(), timestamp_str.encode(), hashlib.sha256).hexdigest()
+        assert signature == expected
+
+    @pytest.mark.parametrize(
+        ("key", "message", "expected"),
+        [
+            # RFC 4231 test case 2: key shorter than the block size
+            (
+                b"Jefe",
+                b"what do ya want for nothing?",
+                "5bdcc146bf60754e6a042426089575c75a003f089d2739839dec58b964ec3843",
+            ),
+            # RFC 4231 test case 6: key longer than the block size is hashed first
+            (
+                b"\xaa" * 131,
+                b"Test Using Larger Than Block-Size Key - Hash Key First",
+                "60e431591ee0b67f0d8a26aacbf5b77f8e0bc6213728c5140546040f0ee37f54",
+            ),
+        ],
+    )
+    def test_hmac_matches_rfc4231_vectors(self, key, message, expected):
+        assert internal._hmac_sha256(key, message).hex() == expected
+        # Cached states must not be mutated by a previous call
+        assert internal._hmac_sha256(key, message).hex() == expected
+
+    def test_timestamp_is_milliseconds(self, internal_token):
+        """Token timestamp should be in milliseconds."""
+        timestamp_str = internal_token.split(".")[0]
+        assert int(timestamp_str) == FROZEN_TIME_NS // 1_000_000
+
+
+class TestVerifyCache:
+    """Test the opt-in VERIFY_CACHE_TTL verification cache."""
+
+    @pytest.fixture(autouse=True)
+    def _clear_cache(self):
+        internal._verify_cache.clear()
+        yield
+        internal._verify_cache.clear()
+
+    def test_disabled_by_default(self, monkeypatch):
+        monkeypatch.delenv("VERIFY_CACHE_TTL", raising=False)
+        auth_header = f"Bearer {generate_internal_token('test-secret')}"
+
+        assert verify_internal_token(auth_header, "test-secret") is True
+        assert internal._verify_cache == {}
+
+    def test_caches_successful_verification(self, monkeypatch):
+        monkeypatch.setenv("VERIFY_CACHE_TTL", "30")
+        auth_header = f"Bearer {generate_internal_token('test-secret')}"
+
+        assert verify_internal_token(auth_header, "test-secret") is True
+        assert len(internal._verify_cache) == 1
+        assert auth_header.encode() not in internal._verify_cache
+
+        with patch("src.auth.internal.hmac.compare_digest") as mock_compare:
+            assert verify_internal_token(auth_header, "test-secret") is True
+        mock_compare.assert_not_called()
+
+    def test_does_not_cache_failures(self, monkeypatch):
+        monkeypatch.setenv("VERIFY_CACHE_TTL", "30")
+        auth_header = f"Bearer {generate_internal_token('secret-1')}"
+
+        assert verify_internal_token(auth_header, "secret-2") is False
+        assert internal._verify_cache == {}
+
+    def test_cache_is_scoped_to_secret(self, monkeypatch):
+        monkeypatch.setenv("VERIFY_CACHE_TTL", "30")
+        auth_header = f"Bearer {generate_internal_token('secret-1')}"
+
+        assert verify_internal_token(auth_header, "secret-1") is True
+        assert verify_internal_token(auth_header, "secret-2") is False
+
+    def test_expired_entry_is_reverified(self, monkeypatch):
+        monkeypatch.setenv("VERIFY_CACHE_TTL", "30")
+        auth_header = f"Bearer {generate_internal_token('test-secret')}"
+        assert verify_internal_token(auth_header, "test-secret") is True
+
+        later_ns = time.time_ns() + (internal.TOKEN_VALIDITY_SECONDS + 1) * 1_000_000_000
+        with patch("src.auth.internal.time.time_ns", return_value=later_ns):
+            assert verify_internal_token(auth_header, "test-secret") is False
+        assert internal._verify_cache == {}
+
+
+@pytest.fixture
+def mock_client():
+    """Pooled control plane client replaced by an AsyncMock for the test."""
+    client = AsyncMock()
+    with patch("src.scheduler.image_builder._get_client", return_value=client):
+        yield client
 
 
 class TestCallbackWithRetry:
     """Test the _callback_with_retry function."""
 
-    @pytest.mark.asyncio
-    async def test_success_on_first_try(self):
+    async def test_success_on_first_try(self, mock_client):
         """Should succeed on first attempt."""
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.raise_for_status = MagicMock()
 
-        mock_client = AsyncMock()
         mock_client.post = AsyncMock(return_value=mock_response)
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock(return_value=None)
 
-        with patch("src.scheduler.image_builder.httpx.AsyncClient", return_value=mock_client):
-            result = await _callback_with_retry(
-                "https://example.com/callback",
-                {"build_id": "test-123"},
-                secret="test-secret",
-            )
+        result = await _callback_with_retry(
+            "https://example.com/callback",
+            {"build_id": "test-123"},
+            secret="test-secret",
+        )
 
         assert result is True
         mock_client.post.assert_called_once()
 
-    @pytest.mark.asyncio
-    async def test_retries_on_failure(self):
+    async def test_retries_on_failure(self, mock_client):
         """Should retry on failure with backoff."""
         mock_response_fail = MagicMock()
         mock_response_fail.status_code = 500
-        mock_response_fail.raise_for_status = MagicMock(
-            side_effect=httpx.HTTPStatusError(
-                "500",
-                request=httpx.Request("POST", "http://test"),
-                response=httpx.Response(500),
-            )
-        )
+        mock_response_fail.raise_for_status = MagicMock(side_effect=_HTTP_500)
 
         mock_response_ok = MagicMock()
         mock_response_ok.status_code = 200
         mock_response_ok.raise_for_status = MagicMock()
 
-        mock_client = AsyncMock()
         mock_client.post = AsyncMock(side_effect=[mock_response_fail, mock_response_ok])
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock(return_value=None)
 
         with (
-            patch("src.scheduler.image_builder.httpx.AsyncClient", return_value=mock_client),
             patch(
                 "src.scheduler.image_builder.asyncio.sleep", new_callable=AsyncMock
             ) as mock_sleep,
@@ -115,20 +259,40 @@ class TestCallbackWithRetry:
 
         assert result is True
         assert mock_client.post.call_count == 2
-        # Should have slept once with backoff
-        mock_sleep.assert_called_once_with(CALLBACK_BACKOFF_BASE**1)
+        # Should have slept once with jittered backoff
+        mock_sleep.assert_called_once()
+        assert 0 <= mock_sleep.call_args.args[0] <= CALLBACK_BACKOFF_BASE**1
 
-    @pytest.mark.asyncio
-    async def test_returns_false_after_all_retries_exhausted(self):
-        """Should return False after all retries fail."""
-        mock_client = AsyncMock()
+    async def test_backoff_is_capped(self, mock_client):
+        """Backoff should never exceed CALLBACK_BACKOFF_MAX."""
         mock_client.post = AsyncMock(side_effect=Exception("connection refused"))
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock(return_value=None)
 
         with (
-            patch("src.scheduler.image_builder.httpx.AsyncClient", return_value=mock_client),
+            patch("src.scheduler.image_builder.CALLBACK_BACKOFF_BASE", 100),
+            patch("src.scheduler.image_builder.random.uniform", return_value=0.5) as mock_uniform,
             patch("src.scheduler.image_builder.asyncio.sleep", new_callable=AsyncMock),
+        ):
+            await _callback_with_retry(
+                "https://example.com/callback",
+                {"build_id": "test-123"},
+                secret="test-secret",
+            )
+
+        for call in mock_uniform.call_args_list:
+            assert call.args == (0, CALLBACK_BACKOFF_MAX)
+
+    async def test_fails_fast_on_client_error(self, mock_client):
+        """Permanent 4xx responses should not be retried."""
+        mock_response = MagicMock()
+        mock_response.status_code = 404
+        mock_response.raise_for_status = MagicMock(side_effect=_HTTP_404)
+
+        mock_client.post = AsyncMock(return_value=mock_response)
+
+        with (
+            patch(
+                "src.scheduler.image_builder.asyncio.sleep", new_callable=AsyncMock
+            ) as mock_sleep,
         ):
             result = await _callback_with_retry(
                 "https://example.com/callback",
@@ -137,36 +301,191 @@ class TestCallbackWithRetry:
             )
 
         assert result is False
-        assert mock_client.post.call_count == CALLBACK_MAX_RETRIES
+        mock_client.post.assert_called_once()
+        mock_sleep.assert_not_called()
+
+    async def test_retries_on_rate_limit(self, mock_client):
+        """429 responses should be retried."""
+        mock_response_429 = MagicMock()
+        mock_response_429.status_code = 429
+        mock_response_429.raise_for_status = MagicMock(side_effect=_HTTP_429)
+
+        mock_response_ok = MagicMock()
+        mock_response_ok.status_code = 200
+        mock_response_ok.raise_for_status = MagicMock()
+
+        mock_client.post = AsyncMock(side_effect=[mock_response_429, mock_response_ok])
 
-    @pytest.mark.asyncio
-    async def test_includes_auth_header(self):
+        with patch("src.scheduler.image_builder.asyncio.sleep", new_callable=AsyncMock):
+            result = await _callback_with_retry(
+                "https://example.com/callback",
+                {"build_id": "test-123"},
+                secret="test-secret",
+            )
+
+        assert result is True
+        assert mock_client.post.call_count == 2
+
+    async def test_returns_false_after_all_retries_exhausted(self, mock_client, monkeypatch):
+        """Should return False after all retries fail."""
+        monkeypatch.setattr(image_builder, "CALLBACK_MAX_RETRIES", 2)
+        mock_client.post = AsyncMock(side_effect=Exception("connection refused"))
+
+        with patch("src.scheduler.image_builder.asyncio.sleep", new_callable=AsyncMock):
+            result = await _callback_with_retry(
+                "https://example.com/callback",
+                {"build_id": "test-123"},
+                secret="test-secret",
+            )
+
+        assert result is False
+        assert mock_client.post.call_count == 2
+
+    async def test_includes_auth_header(self, internal_token, mock_client):
         """Should include Bearer token in auth header."""
         mock_response = MagicMock()
         mock_response.status_code = 200
         mock_response.raise_for_status = MagicMock()
 
-        mock_client = AsyncMock()
         mock_client.post = AsyncMock(return_value=mock_response)
-        mock_client.__aenter__ = AsyncMock(return_value=mock_client)
-        mock_client.__aexit__ = AsyncMock(return_value=None)
 
-        with patch("src.scheduler.image_builder.httpx.AsyncClient", return_value=mock_client):
+        with patch("src.auth.internal.time.time_ns", return_value=FROZEN_TIME_NS):
             await _callback_with_retry(
                 "https://example.com/callback",
                 {"build_id": "test-123"},
                 secret="test-secret",
             )
 
-        # Verify the auth header was included
-        call_kwargs = mock_client.post.call_args
-        headers = call_kwargs.kwargs.get("headers", {})
-        assert "Authorization" in headers
-        assert headers["Authorization"].startswith("Bearer ")
+        # Verify the auth header carries the token signed for the frozen clock
+        headers = mock_client.post.call_args.kwargs.get("headers", {})
+        assert headers.get("Authorization") == f"Bearer {internal_token}"
+
+    async def test_token_generated_once_across_retries(self, mock_client):
+        """Should sign once and reuse the token while it is fresh."""
+        mock_client.post = AsyncMock(side_effect=Exception("connection refused"))
+
+        with (
+            patch("src.scheduler.image_builder.asyncio.sleep", new_callable=AsyncMock),
+            patch(
+                "src.scheduler.image_builder.generate_internal_token",
+                wraps=generate_internal_token,
+            ) as mock_generate,
+        ):
+            await _callback_with_retry(
+                "https://example.com/callback",
+                {"build_id": "test-123"},
+                secret="test-secret",
+            )
+
+        mock_generate.assert_called_once_with("test-secret")
+        tokens = {c.kwargs["headers"]["Authorization"] for c in mock_client.post.call_args_list}
+        assert len(tokens) == 1
+
+    async def test_token_regenerated_after_unauthorized(self, mock_client):
+        """A 401 should cause a fresh token to be minted for the next attempt."""
+        mock_response_401 = MagicMock()
+        mock_response_401.status_code = 401
+        mock_response_401.raise_for_status = MagicMock(side_effect=_HTTP_401)
+
+        mock_response_ok = MagicMock()
+        mock_response_ok.status_code = 200
+        mock_response_ok.raise_for_status = MagicMock()
+
+        mock_client.post = AsyncMock(side_effect=[mock_response_401, mock_response_ok])
+
+        with (
+            patch("src.scheduler.image_builder.asyncio.sleep", new_callable=AsyncMock),
+            patch(
+                "src.scheduler.image_builder.generate_internal_token",
+                wraps=generate_internal_token,
+            ) as mock_generate,
+        ):
+            result = await _callback_with_retry(
+                "https://example.com/callback",
+                {"build_id": "test-123"},
+                secret="test-secret",
+            )
+
+        assert result is True
+        assert mock_generate.call_count == 2
+
+
+class TestGetClient:
+    """Test the pooled control plane HTTP client."""
+
+    @pytest.fixture(autouse=True)
+    def _reset_client(self, monkeypatch):
+        monkeypatch.setattr(image_builder, "_client", None)
+        monkeypatch.setattr(image_builder, "_client_loop", None)
+
+    async def test_reuses_client(self):
+        client = _get_client()
+        assert _get_client() is client
+        await client.aclose()
+
+    async def test_recreates_closed_client(self):
+        client = _get_client()
+        await client.aclose()
+
+        new_client = _get_client()
+        assert new_client is not client
+        await new_client.aclose()
+
+    def test_recreates_client_on_new_event_loop(self):
+        async def get_client() -> httpx.AsyncClient:
+            return _get_client()
+
+        first = asyncio.run(get_client())
+        second = asyncio.run(get_client())
+
+        assert second is not first
+
+    def test_close_client_on_owning_loop(self):
+        async def use_and_close() -> httpx.AsyncClient:
+            client = _get_client()
+            await _close_client()
+            return client
+
+        first = asyncio.run(use_and_close())
+        second = asyncio.run(use_and_close())
+
+        assert first.is_closed
+        assert second.is_closed
+        assert second is not first
+        assert image_builder._client is None
+
+
+class TestPregeneratedToken:
+    """Test that callers can pass a pre-generated token."""
+
+    async def test_callback_uses_given_token(self, mock_client):
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.raise_for_status = MagicMock()
+        mock_client.post = AsyncMock(return_value=mock_response)
+
+        with patch("src.scheduler.image_builder.generate_internal_token") as mock_generate:
+            result = await _callback_with_retry(
+                "https://example.com/callback",
+                {"build_id": "test-123"},
+                token="ts.sig",
+            )
+
+        assert result is True
+        mock_generate.assert_not_called()
+        headers = mock_client.post.call_args.kwargs["headers"]
+        assert headers["Authorization"] == "Bearer ts.sig"
+
+    async def test_api_get_uses_given_token(self, mock_client):
+        mock_client.get = AsyncMock(return_value=MockResponse(200, {"ok": True}))
+
+        with patch("src.scheduler.image_builder.generate_internal_token") as mock_generate:
+            result = await _api_get("https://cp.test/repo-images/status", token="ts.sig")
 
-        # Verify the token is valid
-        token = headers["Authorization"]
-        assert verify_internal_token(token, "test-secret") is True
+        assert result == {"ok": True}
+        mock_generate.assert_not_called()
+        headers = mock_client.get.call_args.kwargs["headers"]
+        assert headers["Authorization"] == "Bearer ts.sig"
 
 
 class TestStreamBuildLogs:
@@ -182,7 +501,6 @@ class TestStreamBuildLogs:
 
         return _aiter()
 
-    @pytest.mark.asyncio
     async def test_returns_sha_and_complete(self):
         """Should return head_sha and build_complete=True on success."""
         log_lines = [
@@ -191,28 +509,24 @@ class TestStreamBuildLogs:
             json.dumps({"level": "info", "event": "git.sync_complete", "head_sha": "abc123def456"}),
             json.dumps({"level": "info", "event": "image_build.complete", "duration_ms": 5000}),
         ]
-        mock_sandbox = MagicMock()
-        mock_sandbox.stdout = self._async_stdout(log_lines)
+        mock_sandbox = SimpleNamespace(stdout=self._async_stdout(log_lines))
 
         sha, complete = await _stream_build_logs(mock_sandbox)
         assert sha == "abc123def456"
         assert complete is True
 
-    @pytest.mark.asyncio
     async def test_complete_without_sha(self):
         """Should return empty SHA but build_complete=True if sync_complete missing."""
         log_lines = [
             json.dumps({"level": "info", "event": "supervisor.start"}),
             json.dumps({"level": "info", "event": "image_build.complete"}),
         ]
-        mock_sandbox = MagicMock()
-        mock_sandbox.stdout = self._async_stdout(log_lines)
+        mock_sandbox = SimpleNamespace(stdout=self._async_stdout(log_lines))
 
         sha, complete = await _stream_build_logs(mock_sandbox)
         assert sha == ""
         assert complete is True
 
-    @pytest.mark.asyncio
     async def test_incomplete_when_sandbox_exits(self):
         """Should return build_complete=False if sandbox exits without image_build.complete."""
         log_lines = [
@@ -220,14 +534,12 @@ class TestStreamBuildLogs:
             json.dumps({"level": "info", "event": "git.sync_complete", "head_sha": "abc123"}),
             json.dumps({"level": "error", "event": "git.clone_error"}),
         ]
-        mock_sandbox = MagicMock()
-        mock_sandbox.stdout = self._async_stdout(log_lines)
+        mock_sandbox = SimpleNamespace(stdout=self._async_stdout(log_lines))
 
         sha, complete = await _stream_build_logs(mock_sandbox)
         assert sha == "abc123"
         assert complete is False
 
-    @pytest.mark.asyncio
     async def test_returns_incomplete_on_error(self):
         """Should return build_complete=False on stream error."""
 
@@ -235,14 +547,12 @@ class TestStreamBuildLogs:
             raise Exception("stream error")
             yield  # noqa: unreachable — makes this an async generator
 
-        mock_sandbox = MagicMock()
-        mock_sandbox.stdout = _raise()
+        mock_sandbox = SimpleNamespace(stdout=_raise())
 
         sha, complete = await _stream_build_logs(mock_sandbox)
         assert sha == ""
         assert complete is False
 
-    @pytest.mark.asyncio
     async def test_handles_malformed_json(self):
         """Should skip malformed JSON lines containing keywords."""
         log_lines = [
@@ -250,8 +560,7 @@ class TestStreamBuildLogs:
             json.dumps({"level": "info", "event": "git.sync_complete", "head_sha": "abc123"}),
             json.dumps({"level": "info", "event": "image_build.complete"}),
         ]
-        mock_sandbox = MagicMock()
-        mock_sandbox.stdout = self._async_stdout(log_lines)
+        mock_sandbox = SimpleNamespace(stdout=self._async_stdout(log_lines))
 
         sha, complete = await _stream_build_logs(mock_sandbox)
         assert sha == "abc123"
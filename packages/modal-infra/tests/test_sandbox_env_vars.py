@@ -1,24 +1,25 @@
 import pytest
 
-from src.sandbox.manager import DEFAULT_SANDBOX_TIMEOUT_SECONDS, SandboxConfig, SandboxManager
+from src.sandbox.manager import DEFAULT_SANDBOX_TIMEOUT_SECONDS, SandboxConfig
 
+SESSION_CONFIG = {
+    "repo_owner": "acme",
+    "repo_name": "repo",
+    "provider": "anthropic",
+    "model": "claude-sonnet-4-6",
+    "session_id": "sess-1",
+}
 
-@pytest.mark.asyncio
-async def test_user_env_vars_override_order(monkeypatch):
-    captured = {}
+GITHUB_TOKEN_VARS = ("GITHUB_APP_TOKEN", "GITHUB_TOKEN")
 
-    def fake_create(*args, **kwargs):
-        captured["env"] = kwargs.get("env")
 
-        class FakeSandbox:
-            object_id = "obj-123"
-            stdout = None
+def _assert_env(env: dict[str, str], equals: dict[str, str | None], absent=()) -> None:
+    """Assert ``env`` has the given values (``None`` meaning unset) and none of ``absent``."""
+    assert {key: env.get(key) for key in equals} == equals
+    assert not env.keys() & set(absent)
 
-        return FakeSandbox()
 
-    monkeypatch.setattr("src.sandbox.manager.modal.Sandbox.create", fake_create)
-
-    manager = SandboxManager()
+async def test_user_env_vars_override_order(sandbox_manager, fake_modal):
     config = SandboxConfig(
         repo_owner="acme",
         repo_name="repo",
@@ -30,45 +31,18 @@ async def test_user_env_vars_override_order(monkeypatch):
         },
     )
 
-    await manager.create_sandbox(config)
-
-    env_vars = captured["env"]
-    assert env_vars["CONTROL_PLANE_URL"] == "https://control-plane.example"
-    assert env_vars["CUSTOM_SECRET"] == "value"
-
-
-@pytest.mark.asyncio
-async def test_restore_user_env_vars_override_order(monkeypatch):
-    captured = {}
-
-    class FakeImage:
-        object_id = "img-123"
+    await sandbox_manager.create_sandbox(config)
 
-    def fake_from_id(*args, **kwargs):
-        return FakeImage()
-
-    def fake_create(*args, **kwargs):
-        captured["env"] = kwargs.get("env")
-
-        class FakeSandbox:
-            object_id = "obj-456"
-            stdout = None
-
-        return FakeSandbox()
+    _assert_env(
+        fake_modal["env"],
+        {"CONTROL_PLANE_URL": "https://control-plane.example", "CUSTOM_SECRET": "value"},
+    )
 
-    monkeypatch.setattr("src.sandbox.manager.modal.Image.from_id", fake_from_id)
-    monkeypatch.setattr("src.sandbox.manager.modal.Sandbox.create", fake_create)
 
-    manager = SandboxManager()
-    await manager.restore_from_snapshot(
+async def test_restore_user_env_vars_override_order(sandbox_manager, fake_modal):
+    await sandbox_manager.restore_from_snapshot(
         snapshot_image_id="img-abc",
-        session_config={
-            "repo_owner": "acme",
-            "repo_name": "repo",
-            "provider": "anthropic",
-            "model": "claude-sonnet-4-6",
-            "session_id": "sess-1",
-        },
+        session_config=SESSION_CONFIG,
         control_plane_url="https://control-plane.example",
         sandbox_auth_token="token-456",
         user_env_vars={
@@ -78,144 +52,56 @@ async def test_restore_user_env_vars_override_order(monkeypatch):
         },
     )
 
-    env_vars = captured["env"]
-    # System vars must override user-provided values
-    assert env_vars["CONTROL_PLANE_URL"] == "https://control-plane.example"
-    assert env_vars["SANDBOX_AUTH_TOKEN"] == "token-456"
-    # User vars that don't collide are preserved
-    assert env_vars["CUSTOM_SECRET"] == "value"
-
-
-@pytest.mark.asyncio
-async def test_restore_uses_default_timeout(monkeypatch):
-    """restore_from_snapshot defaults to DEFAULT_SANDBOX_TIMEOUT_SECONDS."""
-    captured = {}
-
-    class FakeImage:
-        object_id = "img-123"
-
-    def fake_from_id(*args, **kwargs):
-        return FakeImage()
-
-    def fake_create(*args, **kwargs):
-        captured["timeout"] = kwargs.get("timeout")
-
-        class FakeSandbox:
-            object_id = "obj-789"
-            stdout = None
-
-        return FakeSandbox()
-
-    monkeypatch.setattr("src.sandbox.manager.modal.Image.from_id", fake_from_id)
-    monkeypatch.setattr("src.sandbox.manager.modal.Sandbox.create", fake_create)
-
-    manager = SandboxManager()
-    await manager.restore_from_snapshot(
-        snapshot_image_id="img-abc",
-        session_config={
-            "repo_owner": "acme",
-            "repo_name": "repo",
-            "provider": "anthropic",
-            "model": "claude-sonnet-4-6",
-            "session_id": "sess-1",
+    _assert_env(
+        fake_modal["env"],
+        {
+            # System vars must override user-provided values
+            "CONTROL_PLANE_URL": "https://control-plane.example",
+            "SANDBOX_AUTH_TOKEN": "token-456",
+            # User vars that don't collide are preserved
+            "CUSTOM_SECRET": "value",
         },
     )
 
-    assert captured["timeout"] == DEFAULT_SANDBOX_TIMEOUT_SECONDS
-
-
-@pytest.mark.asyncio
-async def test_restore_uses_custom_timeout(monkeypatch):
-    """restore_from_snapshot respects a custom timeout_seconds value."""
-    captured = {}
-
-    class FakeImage:
-        object_id = "img-123"
-
-    def fake_from_id(*args, **kwargs):
-        return FakeImage()
-
-    def fake_create(*args, **kwargs):
-        captured["timeout"] = kwargs.get("timeout")
-
-        class FakeSandbox:
-            object_id = "obj-789"
-            stdout = None
-
-        return FakeSandbox()
 
-    monkeypatch.setattr("src.sandbox.manager.modal.Image.from_id", fake_from_id)
-    monkeypatch.setattr("src.sandbox.manager.modal.Sandbox.create", fake_create)
+@pytest.mark.parametrize(
+    ("timeout_seconds", "expected"),
+    [
+        pytest.param(None, DEFAULT_SANDBOX_TIMEOUT_SECONDS, id="default"),
+        pytest.param(14400, 14400, id="custom"),
+    ],
+)
+async def test_restore_timeout(sandbox_manager, fake_modal, timeout_seconds, expected):
+    """restore_from_snapshot defaults to DEFAULT_SANDBOX_TIMEOUT_SECONDS unless overridden."""
+    kwargs = {} if timeout_seconds is None else {"timeout_seconds": timeout_seconds}
 
-    manager = SandboxManager()
-    await manager.restore_from_snapshot(
+    await sandbox_manager.restore_from_snapshot(
         snapshot_image_id="img-abc",
-        session_config={
-            "repo_owner": "acme",
-            "repo_name": "repo",
-            "provider": "anthropic",
-            "model": "claude-sonnet-4-6",
-            "session_id": "sess-1",
-        },
-        timeout_seconds=14400,
+        session_config=SESSION_CONFIG,
+        **kwargs,
     )
 
-    assert captured["timeout"] == 14400
+    assert fake_modal["timeout"] == expected
 
 
-@pytest.mark.asyncio
-async def test_create_and_restore_timeout_consistency(monkeypatch):
+async def test_create_and_restore_timeout_consistency(sandbox_manager, fake_modal):
     """create_sandbox and restore_from_snapshot produce the same timeout for the same config."""
-    captured_create = {}
-    captured_restore = {}
-
-    class FakeImage:
-        object_id = "img-123"
-
-    def fake_from_id(*args, **kwargs):
-        return FakeImage()
-
-    def fake_create(*args, **kwargs):
-        return_key = "restore" if captured_create.get("timeout") is not None else "create"
-        if return_key == "create":
-            captured_create["timeout"] = kwargs.get("timeout")
-        else:
-            captured_restore["timeout"] = kwargs.get("timeout")
-
-        class FakeSandbox:
-            object_id = "obj-789"
-            stdout = None
-
-        return FakeSandbox()
-
-    monkeypatch.setattr("src.sandbox.manager.modal.Image.from_id", fake_from_id)
-    monkeypatch.setattr("src.sandbox.manager.modal.Sandbox.create", fake_create)
-
-    manager = SandboxManager()
-
     # Create with custom timeout
     config = SandboxConfig(
         repo_owner="acme",
         repo_name="repo",
         timeout_seconds=5400,
     )
-    await manager.create_sandbox(config)
+    await sandbox_manager.create_sandbox(config)
 
     # Restore with same timeout
-    await manager.restore_from_snapshot(
+    await sandbox_manager.restore_from_snapshot(
         snapshot_image_id="img-abc",
-        session_config={
-            "repo_owner": "acme",
-            "repo_name": "repo",
-            "provider": "anthropic",
-            "model": "claude-sonnet-4-6",
-            "session_id": "sess-1",
-        },
+        session_config=SESSION_CONFIG,
         timeout_seconds=5400,
     )
 
-    assert captured_create["timeout"] == captured_restore["timeout"]
-    assert captured_create["timeout"] == 5400
+    assert fake_modal["timeouts"] == [5400, 5400]
 
 
 # ---------------------------------------------------------------------------
@@ -223,140 +109,68 @@ async def test_create_and_restore_timeout_consistency(monkeypatch):
 # ---------------------------------------------------------------------------
 
 
-def _fake_sandbox_create(captured):
-    """Return a fake Sandbox.create that captures env vars."""
-
-    def fake_create(*args, **kwargs):
-        captured["env"] = kwargs.get("env")
-
-        class FakeSandbox:
-            object_id = "obj-vcs"
-            stdout = None
-
-        return FakeSandbox()
-
-    return fake_create
+@pytest.mark.parametrize(
+    ("scm_provider", "clone_token", "host", "username", "expect_github_vars"),
+    [
+        pytest.param(
+            None, "ghp_test123", "github.com", "x-access-token", True, id="default_github"
+        ),
+        pytest.param(
+            "github", "ghp_test123", "github.com", "x-access-token", True, id="explicit_github"
+        ),
+        pytest.param(
+            "bitbucket", "bb_token_abc", "bitbucket.org", "x-token-auth", False, id="bitbucket"
+        ),
+        pytest.param(None, None, "github.com", "x-access-token", False, id="no_token"),
+    ],
+)
+async def test_vcs_env_vars(
+    sandbox_manager,
+    fake_modal,
+    monkeypatch,
+    scm_provider,
+    clone_token,
+    host,
+    username,
+    expect_github_vars,
+):
+    """SCM_PROVIDER selects host/username; token vars are set only when a token is given."""
+    if scm_provider is None:
+        monkeypatch.delenv("SCM_PROVIDER", raising=False)
+    else:
+        monkeypatch.setenv("SCM_PROVIDER", scm_provider)
 
-
-@pytest.mark.asyncio
-async def test_vcs_env_vars_default_github(monkeypatch):
-    """SCM_PROVIDER unset → github.com defaults."""
-    captured = {}
-    monkeypatch.setattr("src.sandbox.manager.modal.Sandbox.create", _fake_sandbox_create(captured))
-    monkeypatch.delenv("SCM_PROVIDER", raising=False)
-
-    manager = SandboxManager()
     config = SandboxConfig(
         repo_owner="acme",
         repo_name="repo",
-        clone_token="ghp_test123",
+        clone_token=clone_token,
     )
-    await manager.create_sandbox(config)
-
-    env = captured["env"]
-    assert env["VCS_HOST"] == "github.com"
-    assert env["VCS_CLONE_USERNAME"] == "x-access-token"
-    assert env["VCS_CLONE_TOKEN"] == "ghp_test123"
-    assert env["GITHUB_APP_TOKEN"] == "ghp_test123"
-    assert env["GITHUB_TOKEN"] == "ghp_test123"
+    await sandbox_manager.create_sandbox(config)
 
+    expected = {"VCS_HOST": host, "VCS_CLONE_USERNAME": username, "VCS_CLONE_TOKEN": clone_token}
+    # GitHub-specific vars only set for GitHub with a token
+    if expect_github_vars:
+        expected |= dict.fromkeys(GITHUB_TOKEN_VARS, clone_token)
+    _assert_env(fake_modal["env"], expected, absent=() if expect_github_vars else GITHUB_TOKEN_VARS)
 
-@pytest.mark.asyncio
-async def test_vcs_env_vars_explicit_github(monkeypatch):
-    """SCM_PROVIDER=github → same as default."""
-    captured = {}
-    monkeypatch.setattr("src.sandbox.manager.modal.Sandbox.create", _fake_sandbox_create(captured))
-    monkeypatch.setenv("SCM_PROVIDER", "github")
 
-    manager = SandboxManager()
-    config = SandboxConfig(
-        repo_owner="acme",
-        repo_name="repo",
-        clone_token="ghp_test123",
-    )
-    await manager.create_sandbox(config)
-
-    env = captured["env"]
-    assert env["VCS_HOST"] == "github.com"
-    assert env["VCS_CLONE_USERNAME"] == "x-access-token"
-    assert env["VCS_CLONE_TOKEN"] == "ghp_test123"
-
-
-@pytest.mark.asyncio
-async def test_vcs_env_vars_bitbucket(monkeypatch):
-    """SCM_PROVIDER=bitbucket → bitbucket.org + x-token-auth."""
-    captured = {}
-    monkeypatch.setattr("src.sandbox.manager.modal.Sandbox.create", _fake_sandbox_create(captured))
-    monkeypatch.setenv("SCM_PROVIDER", "bitbucket")
-
-    manager = SandboxManager()
-    config = SandboxConfig(
-        repo_owner="acme",
-        repo_name="repo",
-        clone_token="bb_token_abc",
-    )
-    await manager.create_sandbox(config)
-
-    env = captured["env"]
-    assert env["VCS_HOST"] == "bitbucket.org"
-    assert env["VCS_CLONE_USERNAME"] == "x-token-auth"
-    assert env["VCS_CLONE_TOKEN"] == "bb_token_abc"
-    # GitHub-specific vars not set for Bitbucket
-    assert "GITHUB_APP_TOKEN" not in env
-    assert "GITHUB_TOKEN" not in env
-
-
-@pytest.mark.asyncio
-async def test_vcs_env_vars_no_token(monkeypatch):
-    """No clone token → token vars absent, host/username still set."""
-    captured = {}
-    monkeypatch.setattr("src.sandbox.manager.modal.Sandbox.create", _fake_sandbox_create(captured))
-    monkeypatch.delenv("SCM_PROVIDER", raising=False)
-
-    manager = SandboxManager()
-    config = SandboxConfig(
-        repo_owner="acme",
-        repo_name="repo",
-    )
-    await manager.create_sandbox(config)
-
-    env = captured["env"]
-    assert env["VCS_HOST"] == "github.com"
-    assert env["VCS_CLONE_USERNAME"] == "x-access-token"
-    assert "VCS_CLONE_TOKEN" not in env
-    assert "GITHUB_APP_TOKEN" not in env
-    assert "GITHUB_TOKEN" not in env
-
-
-@pytest.mark.asyncio
-async def test_restore_vcs_env_vars(monkeypatch):
+async def test_restore_vcs_env_vars(sandbox_manager, fake_modal, monkeypatch):
     """restore_from_snapshot injects VCS env vars."""
-    captured = {}
-
-    class FakeImage:
-        object_id = "img-123"
-
-    monkeypatch.setattr("src.sandbox.manager.modal.Image.from_id", lambda *a, **kw: FakeImage())
-    monkeypatch.setattr("src.sandbox.manager.modal.Sandbox.create", _fake_sandbox_create(captured))
     monkeypatch.setenv("SCM_PROVIDER", "bitbucket")
 
-    manager = SandboxManager()
-    await manager.restore_from_snapshot(
+    await sandbox_manager.restore_from_snapshot(
         snapshot_image_id="img-abc",
-        session_config={
-            "repo_owner": "acme",
-            "repo_name": "repo",
-            "provider": "anthropic",
-            "model": "claude-sonnet-4-6",
-            "session_id": "sess-1",
-        },
+        session_config=SESSION_CONFIG,
         clone_token="bb_token_xyz",
     )
 
-    env = captured["env"]
-    assert env["VCS_HOST"] == "bitbucket.org"
-    assert env["VCS_CLONE_USERNAME"] == "x-token-auth"
-    assert env["VCS_CLONE_TOKEN"] == "bb_token_xyz"
-    # GitHub-specific vars not set for Bitbucket
-    assert "GITHUB_APP_TOKEN" not in env
-    assert "GITHUB_TOKEN" not in env
+    _assert_env(
+        fake_modal["env"],
+        {
+            "VCS_HOST": "bitbucket.org",
+            "VCS_CLONE_USERNAME": "x-token-auth",
+            "VCS_CLONE_TOKEN": "bb_token_xyz",
+        },
+        # GitHub-specific vars not set for Bitbucket
+        absent=GITHUB_TOKEN_VARS,
+    )
@@ -1,48 +1,23 @@
 """Tests for SandboxSupervisor.run_setup_script() and its integration in run()."""
 
-import asyncio
+from contextlib import nullcontext
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import pytest
+
 from src.sandbox.entrypoint import SandboxSupervisor
+from tests.conftest import MockProcess, patch_subprocess_exec
 
 
-def _make_supervisor(tmp_path) -> SandboxSupervisor:
-    """Create a SandboxSupervisor with repo_path pointing at tmp_path."""
-    with patch.dict(
-        "os.environ",
-        {
-            "SANDBOX_ID": "test-sandbox",
-            "CONTROL_PLANE_URL": "https://cp.example.com",
-            "SANDBOX_AUTH_TOKEN": "tok",
-            "REPO_OWNER": "acme",
-            "REPO_NAME": "app",
-        },
-    ):
-        sup = SandboxSupervisor()
-    sup.repo_path = tmp_path / "app"
-    return sup
-
-
-def _create_setup_script(repo_path, content="#!/bin/bash\necho hello\n"):
-    """Create .openinspect/setup.sh inside repo_path."""
-    repo_path.mkdir(parents=True, exist_ok=True)
-    setup_dir = repo_path / ".openinspect"
-    setup_dir.mkdir(parents=True, exist_ok=True)
-    script = setup_dir / "setup.sh"
-    script.write_text(content)
+def _create_setup_script(repo_path, content=b"#!/bin/bash\necho hello\n"):
+    """Create .openinspect/setup.sh inside repo_path (parents included)."""
+    hook_dir = repo_path / ".openinspect"
+    hook_dir.mkdir(parents=True, exist_ok=True)
+    script = hook_dir / "setup.sh"
+    script.write_bytes(content)
     return script
 
 
-def _fake_process(returncode=0, stdout=b""):
-    """Return a mock async process."""
-    proc = MagicMock()
-    proc.returncode = returncode
-    proc.communicate = AsyncMock(return_value=(stdout, None))
-    proc.kill = MagicMock()
-    proc.wait = AsyncMock()
-    return proc
-
-
 # ---------------------------------------------------------------------------
 # TestSetupScriptSkip
 # ---------------------------------------------------------------------------
@@ -51,23 +26,21 @@ def _fake_process(returncode=0, stdout=b""):
 class TestSetupScriptSkip:
     """Cases where the setup script is not run."""
 
-    async def test_skip_when_no_setup_script(self, tmp_path):
-        sup = _make_supervisor(tmp_path)
+    async def test_skip_when_no_setup_script(self, supervisor):
         # repo_path exists but no .openinspect/setup.sh
-        sup.repo_path.mkdir(parents=True, exist_ok=True)
+        supervisor.repo_path.mkdir(parents=True, exist_ok=True)
 
         with patch("asyncio.create_subprocess_exec", new_callable=AsyncMock) as mock_exec:
-            result = await sup.run_setup_script()
+            result = await supervisor.run_setup_script()
 
         assert result is True
         mock_exec.assert_not_called()
 
-    async def test_skip_when_repo_path_missing(self, tmp_path):
-        sup = _make_supervisor(tmp_path)
+    async def test_skip_when_repo_path_missing(self, supervisor):
         # repo_path does not exist at all
 
         with patch("asyncio.create_subprocess_exec", new_callable=AsyncMock) as mock_exec:
-            result = await sup.run_setup_script()
+            result = await supervisor.run_setup_script()
 
         assert result is True
         mock_exec.assert_not_called()
@@ -81,58 +54,51 @@ class TestSetupScriptSkip:
 class TestSetupScriptSuccess:
     """Cases where the setup script runs successfully."""
 
-    async def test_successful_run(self, tmp_path):
-        sup = _make_supervisor(tmp_path)
-        _create_setup_script(sup.repo_path)
-        fake_proc = _fake_process(returncode=0, stdout=b"installed deps\n")
+    async def test_successful_run(self, supervisor):
+        _create_setup_script(supervisor.repo_path)
+        fake_proc = MockProcess(returncode=0, stdout=b"installed deps\n")
 
-        with patch(
-            "asyncio.create_subprocess_exec", new_callable=AsyncMock, return_value=fake_proc
-        ):
-            result = await sup.run_setup_script()
+        with patch_subprocess_exec(fake_proc):
+            result = await supervisor.run_setup_script()
 
         assert result is True
 
-    async def test_bash_called_with_correct_args(self, tmp_path):
-        sup = _make_supervisor(tmp_path)
-        script = _create_setup_script(sup.repo_path)
-        fake_proc = _fake_process(returncode=0, stdout=b"ok\n")
+    async def test_bash_called_with_correct_args(self, supervisor):
+        script = _create_setup_script(supervisor.repo_path)
+        fake_proc = MockProcess(returncode=0, stdout=b"ok\n")
 
-        with patch(
-            "asyncio.create_subprocess_exec", new_callable=AsyncMock, return_value=fake_proc
-        ) as mock_exec:
-            await sup.run_setup_script()
+        with patch_subprocess_exec(fake_proc) as mock_exec:
+            await supervisor.run_setup_script()
 
         mock_exec.assert_called_once()
         call_args = mock_exec.call_args
         assert call_args[0][0] == "bash"
         assert call_args[0][1] == str(script)
-        assert call_args[1]["cwd"] == sup.repo_path
+        assert call_args[1]["cwd"] == supervisor.repo_path
 
-    async def test_stdout_logged_on_success(self, tmp_path):
-        sup = _make_supervisor(tmp_path)
-        _create_setup_script(sup.repo_path)
-        fake_proc = _fake_process(returncode=0, stdout=b"line1\nline2\n")
+    async def test_stdout_drained_on_success(self, supervisor):
+        _create_setup_script(supervisor.repo_path)
+        fake_proc = MockProcess(returncode=0, stdout=[b"line1\n", b"line2\n"])
+        supervisor.log = MagicMock()
 
-        with patch(
-            "asyncio.create_subprocess_exec", new_callable=AsyncMock, return_value=fake_proc
-        ):
-            result = await sup.run_setup_script()
+        with patch_subprocess_exec(fake_proc):
+            result = await supervisor.run_setup_script()
 
         assert result is True
+        # Output is read to EOF before waiting on the process...
+        assert await fake_proc.stdout.read() == b""
+        assert fake_proc.wait_count == 1
+        # ...but never logged when the hook succeeds
+        logged = supervisor.log.method_calls
+        assert not any("output_tail" in call.kwargs for call in logged)
 
-    async def test_inherits_environment(self, tmp_path):
-        sup = _make_supervisor(tmp_path)
-        _create_setup_script(sup.repo_path)
-        fake_proc = _fake_process(returncode=0, stdout=b"")
+    async def test_inherits_environment(self, supervisor, monkeypatch):
+        monkeypatch.setenv("MY_VAR", "hello")
+        _create_setup_script(supervisor.repo_path)
+        fake_proc = MockProcess(returncode=0, stdout=b"")
 
-        with (
-            patch.dict("os.environ", {"MY_VAR": "hello"}, clear=False),
-            patch(
-                "asyncio.create_subprocess_exec", new_callable=AsyncMock, return_value=fake_proc
-            ) as mock_exec,
-        ):
-            await sup.run_setup_script()
+        with patch_subprocess_exec(fake_proc) as mock_exec:
+            await supervisor.run_setup_script()
 
         env_arg = mock_exec.call_args[1]["env"]
         assert "MY_VAR" in env_arg
@@ -147,28 +113,57 @@ class TestSetupScriptSuccess:
 class TestSetupScriptFailure:
     """Cases where the setup script fails."""
 
-    async def test_nonzero_exit_returns_false(self, tmp_path):
-        sup = _make_supervisor(tmp_path)
-        _create_setup_script(sup.repo_path, content="#!/bin/bash\nexit 1\n")
-        fake_proc = _fake_process(returncode=1, stdout=b"error: something broke\n")
+    async def test_nonzero_exit_returns_false(self, supervisor):
+        _create_setup_script(supervisor.repo_path, content=b"#!/bin/bash\nexit 1\n")
+        fake_proc = MockProcess(returncode=1, stdout=b"error: something broke\n")
 
-        with patch(
-            "asyncio.create_subprocess_exec", new_callable=AsyncMock, return_value=fake_proc
-        ):
-            result = await sup.run_setup_script()
+        with patch_subprocess_exec(fake_proc):
+            result = await supervisor.run_setup_script()
 
         assert result is False
 
-    async def test_exception_returns_false(self, tmp_path):
-        sup = _make_supervisor(tmp_path)
-        _create_setup_script(sup.repo_path)
+    async def test_failure_logs_output_tail(self, supervisor):
+        _create_setup_script(supervisor.repo_path)
+        lines = [f"line{i}\n".encode() for i in range(60)]
+        fake_proc = MockProcess(returncode=1, stdout=lines)
+        supervisor.log = MagicMock()
+
+        with patch_subprocess_exec(fake_proc):
+            result = await supervisor.run_setup_script()
+
+        assert result is False
+        output_tail = supervisor.log.error.call_args.kwargs["output_tail"]
+        assert output_tail.splitlines() == [f"line{i}" for i in range(10, 60)]
+
+    async def test_output_tail_bounded_by_bytes_and_lines(self, supervisor):
+        _create_setup_script(supervisor.repo_path)
+        # 60 lines of 2000 bytes: more than both HOOK_OUTPUT_TAIL_LINES and _BYTES
+        lines = [f"{i:03d}:".encode() + b"x" * 1995 + b"\n" for i in range(60)]
+        output = b"".join(lines)
+        assert len(lines) > SandboxSupervisor.HOOK_OUTPUT_TAIL_LINES
+        assert len(output) > SandboxSupervisor.HOOK_OUTPUT_TAIL_BYTES
+        fake_proc = MockProcess(returncode=1, stdout=lines)
+        supervisor.log = MagicMock()
+
+        with patch_subprocess_exec(fake_proc):
+            await supervisor.run_setup_script()
+
+        output_tail = supervisor.log.error.call_args.kwargs["output_tail"]
+        kept = output[-SandboxSupervisor.HOOK_OUTPUT_TAIL_BYTES :].decode().splitlines()
+        assert output_tail == "\n".join(kept[-SandboxSupervisor.HOOK_OUTPUT_TAIL_LINES :])
+        # Only the last 64 KiB survive, cutting into an earlier line
+        assert output_tail.startswith("x")
+        assert output_tail.endswith("059:" + "x" * 1995)
+
+    async def test_exception_returns_false(self, supervisor):
+        _create_setup_script(supervisor.repo_path)
 
         with patch(
             "asyncio.create_subprocess_exec",
             new_callable=AsyncMock,
             side_effect=OSError("exec failed"),
         ):
-            result = await sup.run_setup_script()
+            result = await supervisor.run_setup_script()
 
         assert result is False
 
@@ -181,89 +176,50 @@ class TestSetupScriptFailure:
 class TestSetupScriptTimeout:
     """Timeout handling for the setup script."""
 
-    async def test_timeout_kills_process(self, tmp_path):
-        sup = _make_supervisor(tmp_path)
-        _create_setup_script(sup.repo_path)
-        fake_proc = _fake_process()
-        fake_proc.communicate = AsyncMock(side_effect=TimeoutError)
-        fake_proc.stdout = MagicMock()
-        fake_proc.stdout.read = AsyncMock(return_value=b"partial output\n")
+    async def test_timeout_kills_process(self, supervisor):
+        _create_setup_script(supervisor.repo_path)
+        fake_proc = MockProcess(stdout=b"partial output\n", hang=True)
 
-        with patch(
-            "asyncio.create_subprocess_exec", new_callable=AsyncMock, return_value=fake_proc
-        ):
-            result = await sup.run_setup_script()
+        with patch_subprocess_exec(fake_proc):
+            result = await supervisor.run_setup_script()
 
         assert result is False
-        fake_proc.kill.assert_called_once()
-        fake_proc.wait.assert_awaited_once()
-
-    async def test_default_timeout_300(self, tmp_path):
-        sup = _make_supervisor(tmp_path)
-        _create_setup_script(sup.repo_path)
-        fake_proc = _fake_process(returncode=0, stdout=b"ok\n")
-        captured_timeout = {}
-
-        original_wait_for = asyncio.wait_for
-
-        async def capturing_wait_for(coro, *, timeout=None):
-            captured_timeout["value"] = timeout
-            return await original_wait_for(coro, timeout=timeout)
-
-        with (
-            patch.dict("os.environ", {}, clear=False),
-            patch("asyncio.create_subprocess_exec", new_callable=AsyncMock, return_value=fake_proc),
-            patch("asyncio.wait_for", side_effect=capturing_wait_for),
-        ):
-            import os
-
-            os.environ.pop("SETUP_TIMEOUT_SECONDS", None)
-            await sup.run_setup_script()
-
-        assert captured_timeout["value"] == 300
-
-    async def test_custom_timeout_from_env(self, tmp_path):
-        sup = _make_supervisor(tmp_path)
-        _create_setup_script(sup.repo_path)
-        fake_proc = _fake_process(returncode=0, stdout=b"ok\n")
-        captured_timeout = {}
-
-        original_wait_for = asyncio.wait_for
-
-        async def capturing_wait_for(coro, *, timeout=None):
-            captured_timeout["value"] = timeout
-            return await original_wait_for(coro, timeout=timeout)
+        assert fake_proc.kill_count == 1
+        assert fake_proc.wait_count == 1
+
+    @pytest.mark.parametrize(
+        ("timeout_seconds", "expected"),
+        [
+            pytest.param(None, 300, id="default"),
+            pytest.param(60, 60, id="custom"),
+        ],
+    )
+    async def test_timeout_applied(self, supervisor, timeout_seconds, expected):
+        _create_setup_script(supervisor.repo_path)
+        if timeout_seconds is not None:
+            supervisor.setup_timeout_seconds = timeout_seconds
+        fake_proc = MockProcess(returncode=0, stdout=b"ok\n")
 
         with (
-            patch.dict("os.environ", {"SETUP_TIMEOUT_SECONDS": "60"}, clear=False),
-            patch("asyncio.create_subprocess_exec", new_callable=AsyncMock, return_value=fake_proc),
-            patch("asyncio.wait_for", side_effect=capturing_wait_for),
+            patch_subprocess_exec(fake_proc),
+            patch("asyncio.timeout", return_value=nullcontext()) as mock_timeout,
         ):
-            await sup.run_setup_script()
-
-        assert captured_timeout["value"] == 60
+            result = await supervisor.run_setup_script()
 
-    async def test_invalid_timeout_env_uses_default(self, tmp_path):
-        sup = _make_supervisor(tmp_path)
-        _create_setup_script(sup.repo_path)
-        fake_proc = _fake_process(returncode=0, stdout=b"ok\n")
-        captured_timeout = {}
+        assert result is True
+        mock_timeout.assert_called_once_with(expected)
 
-        original_wait_for = asyncio.wait_for
+    @pytest.mark.parametrize(
+        ("env_value", "expected"),
+        [
+            pytest.param("60", 60, id="valid"),
+            pytest.param("not_a_number", 300, id="invalid_uses_default"),
+        ],
+    )
+    def test_timeout_read_from_env(self, monkeypatch, env_value, expected):
+        monkeypatch.setenv("SETUP_TIMEOUT_SECONDS", env_value)
 
-        async def capturing_wait_for(coro, *, timeout=None):
-            captured_timeout["value"] = timeout
-            return await original_wait_for(coro, timeout=timeout)
-
-        with (
-            patch.dict("os.environ", {"SETUP_TIMEOUT_SECONDS": "not_a_number"}, clear=False),
-            patch("asyncio.create_subprocess_exec", new_callable=AsyncMock, return_value=fake_proc),
-            patch("asyncio.wait_for", side_effect=capturing_wait_for),
-        ):
-            result = await sup.run_setup_script()
-
-        assert result is True
-        assert captured_timeout["value"] == 300
+        assert SandboxSupervisor().setup_timeout_seconds == expected
 
 
 # ---------------------------------------------------------------------------
@@ -274,52 +230,44 @@ class TestSetupScriptTimeout:
 class TestSetupInRun:
     """Verify run_setup_script is called at the right point in run()."""
 
-    async def test_run_calls_setup_on_fresh_clone(self, tmp_path):
-        sup = _make_supervisor(tmp_path)
-
+    async def test_run_calls_setup_on_fresh_clone(self, supervisor, monkeypatch):
         # Mock all phases
-        sup.perform_git_sync = AsyncMock(return_value=True)
-        sup.run_setup_script = AsyncMock(return_value=True)
-        sup.run_start_script = AsyncMock(return_value=True)
-        sup.start_opencode = AsyncMock()
-        sup.start_bridge = AsyncMock()
-        sup.monitor_processes = AsyncMock()
+        supervisor.perform_git_sync = AsyncMock(return_value=True)
+        supervisor.run_setup_script = AsyncMock(return_value=True)
+        supervisor.run_start_script = AsyncMock(return_value=True)
+        supervisor.start_opencode = AsyncMock()
+        supervisor.start_bridge = AsyncMock()
+        supervisor.monitor_processes = AsyncMock()
 
         # No snapshot restore
-        with (
-            patch.dict("os.environ", {"RESTORED_FROM_SNAPSHOT": "false"}, clear=False),
-            patch("asyncio.get_event_loop") as mock_loop,
-        ):
+        monkeypatch.setenv("RESTORED_FROM_SNAPSHOT", "false")
+        with patch("asyncio.get_event_loop") as mock_loop:
             mock_loop.return_value.add_signal_handler = MagicMock()
-            await sup.run()
+            await supervisor.run()
 
-        sup.run_setup_script.assert_called_once()
+        supervisor.run_setup_script.assert_called_once()
 
         # Verify ordering: run_setup_script before run_start_script before start_opencode
         call_order = []
         for name in ["run_setup_script", "run_start_script", "start_opencode"]:
-            mock = getattr(sup, name)
+            mock = getattr(supervisor, name)
             if mock.call_count > 0:
                 call_order.append(name)
         assert call_order == ["run_setup_script", "run_start_script", "start_opencode"]
 
-    async def test_run_skips_setup_on_snapshot_restore(self, tmp_path):
-        sup = _make_supervisor(tmp_path)
-
+    async def test_run_skips_setup_on_snapshot_restore(self, supervisor, monkeypatch):
         # Mock all phases
-        sup._quick_git_fetch = AsyncMock()
-        sup.run_setup_script = AsyncMock(return_value=True)
-        sup.run_start_script = AsyncMock(return_value=True)
-        sup.start_opencode = AsyncMock()
-        sup.start_bridge = AsyncMock()
-        sup.monitor_processes = AsyncMock()
-
-        with (
-            patch.dict("os.environ", {"RESTORED_FROM_SNAPSHOT": "true"}, clear=False),
-            patch("asyncio.get_event_loop") as mock_loop,
-        ):
+        supervisor._quick_git_fetch = AsyncMock()
+        supervisor.run_setup_script = AsyncMock(return_value=True)
+        supervisor.run_start_script = AsyncMock(return_value=True)
+        supervisor.start_opencode = AsyncMock()
+        supervisor.start_bridge = AsyncMock()
+        supervisor.monitor_processes = AsyncMock()
+
+        monkeypatch.setenv("RESTORED_FROM_SNAPSHOT", "true")
+        with patch("asyncio.get_event_loop") as mock_loop:
             mock_loop.return_value.add_signal_handler = MagicMock()
-            await sup.run()
+            await supervisor.run()
 
-        sup.run_setup_script.assert_not_called()
-        sup.run_start_script.assert_called_once()
+        supervisor.run_setup_script.assert_not_called()
+        supervisor.run_start_script.assert_called_once()